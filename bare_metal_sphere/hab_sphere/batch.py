@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import matplotlib
+
+from hab_sphere.cli import (
+    MIN_VALID_R_KM,
+    _first_radius_km_where,
+    _parse_h_i,
+    _radius_grid,
+    write_results_csv,
+)
+from hab_sphere.physics import (
+    get_material,
+    material_names,
+    pressure_thickness,
+    shielding_radius_threshold,
+    wall_areal_mass,
+)
+from hab_sphere.plots import plot_combined, plot_shielding, plot_thermal
+from hab_sphere.solve import solve_qppp_max_material
+
+
+def _parse_float_list(name: str, text: str) -> list[float]:
+    vals = [float(part) for part in text.split(",") if part.strip()]
+    if not vals:
+        raise ValueError(f"{name} provided but no values parsed")
+    return vals
+
+
+def _tag(value: float) -> str:
+    return f"{value:g}".replace(".", "p")
+
+
+def _fmt_km(r_km: float | None) -> str:
+    return "none" if r_km is None else f"{r_km:.6g}"
+
+
+def _init_plot_worker() -> None:
+    # Non-interactive backend in the parent and in every worker; no figure exists yet at this point.
+    matplotlib.use("Agg")
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Batch feasibility runs over materials x epsilons x pressures x T_in_max with parallel plotting."
+    )
+    parser.add_argument("--materials", type=str, default=",".join(material_names()))
+    parser.add_argument("--epsilon_list", type=str, default="0.2,0.8")
+    parser.add_argument("--p_list", type=str, default="101325")
+    parser.add_argument("--T_in_max_list", type=str, default="303")
+    parser.add_argument("--T_space", type=float, default=3.0)
+    parser.add_argument("--h_i", type=str, default="inf")
+    parser.add_argument(
+        "--temp_constraint_target",
+        choices=["inner_surface", "air"],
+        default="inner_surface",
+    )
+    parser.add_argument("--q_expected", type=float, default=0.023)
+    parser.add_argument("--mu_req", type=float, default=2000.0)
+
+    parser.add_argument("--R_min_km", type=float, default=0.1)
+    parser.add_argument("--R_max_km", type=float, default=200.0)
+    parser.add_argument("--N", type=int, default=400)
+    parser.add_argument("--R_scale", choices=["linear", "log"], default="log")
+    parser.add_argument("--out_dir", type=Path, default=Path("batch"))
+    parser.add_argument("--workers", type=int, default=None, help="Plot processes (default: CPU count; 1 renders inline)")
+    parser.add_argument("--no_plots", action="store_true", help="Write CSVs and the report only")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    _init_plot_worker()
+    if args.R_min_km < MIN_VALID_R_KM:
+        raise ValueError(
+            f"R_min_km must be >= {MIN_VALID_R_KM} km (100 m) for model validity; got {args.R_min_km}"
+        )
+    if args.R_max_km <= args.R_min_km:
+        raise ValueError(f"R_max_km must be greater than R_min_km; got {args.R_max_km} <= {args.R_min_km}")
+
+    materials = [m.strip() for m in args.materials.split(",") if m.strip()]
+    unknown = [m for m in materials if m not in material_names()]
+    if not materials or unknown:
+        raise ValueError(f"materials must be a comma-separated subset of {material_names()}; got {args.materials!r}")
+    epsilon_values = _parse_float_list("epsilon_list", args.epsilon_list)
+    p_values = _parse_float_list("p_list", args.p_list)
+    T_in_max_values = _parse_float_list("T_in_max_list", args.T_in_max_list)
+    h_i = _parse_h_i(args.h_i)
+
+    t_start = time.perf_counter()
+    R_m = _radius_grid(args.R_min_km, args.R_max_km, args.N, args.R_scale)
+    R_km = R_m / 1_000.0
+
+    # (function, kwargs) for every figure; rendered after all arrays are computed.
+    plot_jobs: list[tuple] = []
+    shielding_plots: set[Path] = set()
+    rows: list[dict[str, object]] = []
+
+    for material in materials:
+        mat = get_material(material)
+        for p in p_values:
+            case_dir = args.out_dir / material / f"p{_tag(p)}"
+            case_dir.mkdir(parents=True, exist_ok=True)
+
+            for T_in_max in T_in_max_values:
+                run_dir = case_dir / f"Tin{_tag(T_in_max)}"
+                run_dir.mkdir(parents=True, exist_ok=True)
+                # The wall is sized at sigma_allow(T_in_max); constant-sigma materials share one shielding plot per p.
+                sigma_allow = mat.sigma_allow_at(T_in_max)
+                t_m = pressure_thickness(R_m, p, sigma_allow)
+                mu_wall = wall_areal_mass(R_m, p, sigma_allow, mat.rho)
+                ok_shielding = mu_wall >= args.mu_req
+                r_shield = _first_radius_km_where(ok_shielding, R_km)
+                r_shield_analytic_km = shielding_radius_threshold(args.mu_req, sigma_allow, mat.rho, p) / 1000.0
+                shield_dir = case_dir if mat.sigma_curve is None else run_dir
+                shielding_plot = shield_dir / f"shielding_{material}.png"
+                if shielding_plot not in shielding_plots:
+                    shielding_plots.add(shielding_plot)
+                    plot_jobs.append(
+                        (
+                            plot_shielding,
+                            dict(out_dir=shield_dir, material=material, R_km=R_km, mu_wall=mu_wall, mu_req=args.mu_req, xscale=args.R_scale),
+                        )
+                    )
+
+                for epsilon in epsilon_values:
+                    qppp_max = solve_qppp_max_material(
+                        R_m=R_m,
+                        T_in_max=T_in_max,
+                        target=args.temp_constraint_target,
+                        p=p,
+                        material=mat,
+                        epsilon=epsilon,
+                        T_space=args.T_space,
+                        h_i=h_i,
+                    )
+                    ok_thermal = qppp_max >= args.q_expected
+                    ok_both = ok_thermal & ok_shielding
+
+                    eps_tag = str(epsilon).replace(".", "p")
+                    csv_path = run_dir / f"results_{material}_eps{eps_tag}.csv"
+                    write_results_csv(
+                        csv_path,
+                        R_m=R_m,
+                        t_m=t_m,
+                        mu_wall=mu_wall,
+                        qppp_max=qppp_max,
+                        ok_thermal=ok_thermal,
+                        ok_shielding=ok_shielding,
+                    )
+
+                    common = dict(
+                        out_dir=run_dir,
+                        material=material,
+                        epsilon=epsilon,
+                        R_km=R_km,
+                        qppp_max=qppp_max,
+                        q_expected=args.q_expected,
+                        xscale=args.R_scale,
+                    )
+                    plot_jobs.append((plot_thermal, common))
+                    plot_jobs.append((plot_combined, dict(common, mu_wall=mu_wall, mu_req=args.mu_req)))
+
+                    rel = run_dir.relative_to(args.out_dir)
+                    rows.append(
+                        {
+                            "material": material,
+                            "p": p,
+                            "T_in_max": T_in_max,
+                            "epsilon": epsilon,
+                            "r_thermal_km": _first_radius_km_where(ok_thermal, R_km),
+                            "r_shield_km": r_shield,
+                            "r_both_km": _first_radius_km_where(ok_both, R_km),
+                            "r_shield_analytic_km": r_shield_analytic_km,
+                            "csv": (rel / csv_path.name).as_posix(),
+                            "shielding_plot": shielding_plot.relative_to(args.out_dir).as_posix(),
+                            "thermal_plot": (rel / f"thermal_{material}_eps{eps_tag}.png").as_posix(),
+                            "combined_plot": (rel / f"combined_{material}_eps{eps_tag}.png").as_posix(),
+                        }
+                    )
+    t_compute = time.perf_counter() - t_start
+
+    if not args.no_plots:
+        if args.workers == 1:
+            for fn, kwargs in plot_jobs:
+                fn(**kwargs)
+        else:
+            with ProcessPoolExecutor(max_workers=args.workers or os.cpu_count(), initializer=_init_plot_worker) as pool:
+                futures = [pool.submit(fn, **kwargs) for fn, kwargs in plot_jobs]
+                for fut in futures:
+                    fut.result()
+    t_total = time.perf_counter() - t_start
+
+    summary_path = args.out_dir / "summary.csv"
+    with summary_path.open("w", newline="", encoding="utf-8") as f:
+        fields = ["material", "p", "T_in_max", "epsilon", "r_thermal_km", "r_shield_km", "r_both_km", "r_shield_analytic_km", "csv"]
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        for row in rows:
+            writer.writerow(["" if row[name] is None else row[name] for name in fields])
+
+    report_path = args.out_dir / "README.md"
+    with report_path.open("w", encoding="utf-8") as f:
+        f.write("# Habitat Sphere Batch Report\n\n")
+        f.write("Generated by `python -m hab_sphere.batch`.\n\n")
+        f.write("## Run Parameters\n\n")
+        f.write(f"- materials: `{', '.join(materials)}`\n")
+        f.write(f"- epsilon: `{', '.join(f'{v:g}' for v in epsilon_values)}`\n")
+        f.write(f"- p (Pa): `{', '.join(f'{v:g}' for v in p_values)}`\n")
+        f.write(f"- T_in_max (K): `{', '.join(f'{v:g}' for v in T_in_max_values)}`\n")
+        f.write(f"- T_space (K): `{args.T_space}`\n")
+        f.write(f"- h_i (W/m^2/K): `{'inf' if math.isinf(h_i) else h_i}`\n")
+        f.write(f"- temp_constraint_target: `{args.temp_constraint_target}`\n")
+        f.write(f"- q_expected (W/m^3): `{args.q_expected}`\n")
+        f.write(f"- mu_req (kg/m^2): `{args.mu_req}`\n")
+        f.write(f"- radius range (km): `{args.R_min_km}` to `{args.R_max_km}`\n")
+        f.write(f"- N: `{args.N}`\n")
+        f.write(f"- R_scale: `{args.R_scale}`\n")
+        f.write("\n")
+        f.write("## Summary\n\n")
+        f.write("First passing radius (km) per case; full table in [summary.csv](summary.csv).\n\n")
+        f.write("| material | p (Pa) | T_in_max (K) | epsilon | thermal | shielding | both | csv |\n")
+        f.write("|---|---|---|---|---|---|---|---|\n")
+        for row in rows:
+            f.write(
+                f"| {row['material']} | {row['p']:g} | {row['T_in_max']:g} | {row['epsilon']:g} "
+                f"| {_fmt_km(row['r_thermal_km'])} | {_fmt_km(row['r_shield_km'])} | {_fmt_km(row['r_both_km'])} "
+                f"| [csv]({row['csv']}) |\n"
+            )
+        f.write("\n")
+        if not args.no_plots:
+            shown: set[str] = set()
+            for row in rows:
+                if row["shielding_plot"] not in shown:
+                    shown.add(row["shielding_plot"])
+                    heading = f"{row['material']}, p = {row['p']:g} Pa"
+                    if get_material(str(row["material"])).sigma_curve is not None:
+                        heading += f", T_in_max = {row['T_in_max']:g} K"
+                    f.write(f"## {heading}\n\n")
+                    f.write(f"![shielding]({row['shielding_plot']})\n\n")
+                label = f"T_in_max {row['T_in_max']:g} K, eps {row['epsilon']:g}"
+                f.write(f"### {label}\n\n")
+                f.write(f"![thermal {label}]({row['thermal_plot']})\n\n")
+                f.write(f"![combined {label}]({row['combined_plot']})\n\n")
+
+    print(f"Cases: {len(rows)} ({len(materials)} materials x {len(p_values)} p x {len(T_in_max_values)} T_in_max x {len(epsilon_values)} eps)")
+    print(f"Arrays + CSVs: {t_compute:.3g} s")
+    if not args.no_plots:
+        print(f"Plots: {len(plot_jobs)} figures")
+    print(f"Total: {t_total:.3g} s")
+    print(f"Wrote {summary_path}")
+    print(f"Wrote {report_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,12 +8,13 @@ import math
 import numpy as np
 
 from hab_sphere.physics import (
-    MATERIAL_PRESETS,
+    get_material,
+    material_names,
     pressure_thickness,
     shielding_radius_threshold,
     wall_areal_mass,
 )
-from hab_sphere.solve import solve_qppp_max
+from hab_sphere.solve import solve_qppp_max_material
 from hab_sphere.plots import plot_combined, plot_shielding, plot_thermal
 
 MIN_VALID_R_KM = 0.1
@@ -21,7 +22,7 @@ MIN_VALID_R_KM = 0.1
 
 def _parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Spherical habitat feasibility plots.")
-    parser.add_argument("--material", choices=sorted(MATERIAL_PRESETS.keys()), default="steel")
+    parser.add_argument("--material", choices=material_names(), default="steel")
 
     parser.add_argument("--p", type=float, default=101325.0)
     parser.add_argument("--sigma_allow", type=float, default=None)
@@ -83,6 +84,46 @@ def _first_radius_km_where(mask: np.ndarray, R_km: np.ndarray) -> float | None:
     return float(R_km[idx[0]])
 
 
+def write_results_csv(
+    csv_path: Path,
+    *,
+    R_m: np.ndarray,
+    t_m: np.ndarray,
+    mu_wall: np.ndarray,
+    qppp_max: np.ndarray,
+    ok_thermal: np.ndarray,
+    ok_shielding: np.ndarray,
+) -> None:
+    ok_both = ok_thermal & ok_shielding
+    with csv_path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            [
+                "R_m",
+                "R_km",
+                "t_m",
+                "mu_wall",
+                "qppp_max",
+                "ok_thermal",
+                "ok_shielding",
+                "ok_both",
+            ]
+        )
+        for i in range(len(R_m)):
+            writer.writerow(
+                [
+                    float(R_m[i]),
+                    float(R_m[i] / 1_000.0),
+                    float(t_m[i]),
+                    float(mu_wall[i]),
+                    float(qppp_max[i]),
+                    int(ok_thermal[i]),
+                    int(ok_shielding[i]),
+                    int(ok_both[i]),
+                ]
+            )
+
+
 def main() -> None:
     args = _parse_args()
     if args.R_min_km < MIN_VALID_R_KM:
@@ -92,10 +133,11 @@ def main() -> None:
     if args.R_max_km <= args.R_min_km:
         raise ValueError(f"R_max_km must be greater than R_min_km; got {args.R_max_km} <= {args.R_min_km}")
 
-    mat = MATERIAL_PRESETS[args.material]
-    sigma_allow = mat.sigma_allow if args.sigma_allow is None else args.sigma_allow
+    mat = get_material(args.material)
+    # The pressure wall is sized at the hottest allowed inner-wall temperature.
+    sigma_allow = mat.sigma_allow_at(args.T_in_max) if args.sigma_allow is None else args.sigma_allow
     rho = mat.rho if args.rho is None else args.rho
-    k = mat.k if args.k is None else args.k
+    k = mat.k_at(args.T_in_max) if args.k is None else args.k
     h_i = _parse_h_i(args.h_i)
     epsilon_values = _epsilon_values(args)
 
@@ -104,8 +146,8 @@ def main() -> None:
     R_m = _radius_grid(args.R_min_km, args.R_max_km, args.N, args.R_scale)
     R_km = R_m / 1_000.0
 
-    t_m = np.array([pressure_thickness(r, args.p, sigma_allow) for r in R_m])
-    mu_wall = np.array([wall_areal_mass(r, args.p, sigma_allow, rho) for r in R_m])
+    t_m = pressure_thickness(R_m, args.p, sigma_allow)
+    mu_wall = wall_areal_mass(R_m, args.p, sigma_allow, rho)
     ok_shielding = mu_wall >= args.mu_req
 
     shielding_plot_path = plot_shielding(
@@ -121,21 +163,17 @@ def main() -> None:
     report_sections: list[dict[str, str | float]] = []
 
     for epsilon in epsilon_values:
-        qppp_max = np.array(
-            [
-                solve_qppp_max(
-                    R_m=float(r),
-                    T_in_max=args.T_in_max,
-                    target=args.temp_constraint_target,
-                    p=args.p,
-                    sigma_allow=sigma_allow,
-                    k=k,
-                    epsilon=epsilon,
-                    T_space=args.T_space,
-                    h_i=h_i,
-                )
-                for r in R_m
-            ]
+        qppp_max = solve_qppp_max_material(
+            R_m=R_m,
+            T_in_max=args.T_in_max,
+            target=args.temp_constraint_target,
+            p=args.p,
+            material=mat,
+            epsilon=epsilon,
+            T_space=args.T_space,
+            h_i=h_i,
+            k=args.k,
+            sigma_allow=args.sigma_allow,
         )
 
         ok_thermal = qppp_max >= args.q_expected
@@ -166,33 +204,15 @@ def main() -> None:
 
         eps_tag = str(epsilon).replace(".", "p")
         csv_path = out_dir / f"results_{args.material}_eps{eps_tag}.csv"
-        with csv_path.open("w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(
-                [
-                    "R_m",
-                    "R_km",
-                    "t_m",
-                    "mu_wall",
-                    "qppp_max",
-                    "ok_thermal",
-                    "ok_shielding",
-                    "ok_both",
-                ]
-            )
-            for i in range(len(R_m)):
-                writer.writerow(
-                    [
-                        float(R_m[i]),
-                        float(R_km[i]),
-                        float(t_m[i]),
-                        float(mu_wall[i]),
-                        float(qppp_max[i]),
-                        int(ok_thermal[i]),
-                        int(ok_shielding[i]),
-                        int(ok_both[i]),
-                    ]
-                )
+        write_results_csv(
+            csv_path,
+            R_m=R_m,
+            t_m=t_m,
+            mu_wall=mu_wall,
+            qppp_max=qppp_max,
+            ok_thermal=ok_thermal,
+            ok_shielding=ok_shielding,
+        )
         print(f"Wrote {csv_path}")
 
         r_thermal = _first_radius_km_where(ok_thermal, R_km)
@@ -243,6 +263,9 @@ def main() -> None:
         f.write(f"- sigma_allow (Pa): `{sigma_allow}`\n")
         f.write(f"- rho (kg/m^3): `{rho}`\n")
         f.write(f"- k (W/m/K): `{k}`\n")
+        if mat.temperature_dependent:
+            f.write("- property curves: `materials.json` (k and sigma_allow above are at T_in_max; the thermal limit ")
+            f.write("uses them at the wall temperature)\n")
         f.write(f"- T_space (K): `{args.T_space}`\n")
         f.write(f"- T_in_max (K): `{args.T_in_max}`\n")
         f.write(f"- h_i (W/m^2/K): `{'inf' if math.isinf(h_i) else h_i}`\n")
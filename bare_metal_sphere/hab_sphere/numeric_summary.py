@@ -6,7 +6,7 @@ from typing import Iterable
 
 import numpy as np
 
-from hab_sphere.physics import MATERIAL_PRESETS, shielding_radius_threshold, temperatures
+from hab_sphere.physics import Material, get_material, material_names, material_temperatures, shielding_radius_threshold
 
 MIN_VALID_R_KM = 0.1
 
@@ -37,18 +37,16 @@ def _target_temp(
     R_m: float,
     qppp: float,
     p: float,
-    sigma_allow: float,
-    k: float,
+    material: Material,
     epsilon: float,
     T_space: float,
     h_i: float,
 ) -> float:
-    T_in_surf, T_air, _ = temperatures(
+    T_in_surf, T_air, _, _, _ = material_temperatures(
+        material=material,
         R_m=R_m,
         qppp=qppp,
         p=p,
-        sigma_allow=sigma_allow,
-        k=k,
         epsilon=epsilon,
         T_space=T_space,
         h_i=h_i,
@@ -61,26 +59,24 @@ def _target_temp(
 
 
 def _thermal_g(
-    R_m: float,
+    R_m: np.ndarray | float,
     *,
     q_expected: float,
     T_in_max: float,
     target: str,
     p: float,
-    sigma_allow: float,
-    k: float,
+    material: Material,
     epsilon: float,
     T_space: float,
     h_i: float,
-) -> float:
+) -> np.ndarray | float:
     return (
         _target_temp(
             target=target,
             R_m=R_m,
             qppp=q_expected,
             p=p,
-            sigma_allow=sigma_allow,
-            k=k,
+            material=material,
             epsilon=epsilon,
             T_space=T_space,
             h_i=h_i,
@@ -89,101 +85,125 @@ def _thermal_g(
     )
 
 
-def _bisect_root(
-    left: float,
-    right: float,
+def _itp_roots(
+    left: np.ndarray,
+    right: np.ndarray,
+    f_left: np.ndarray,
+    f_right: np.ndarray,
     fn,
     max_iter: int = 120,
     tol_abs: float = 1e-9,
-) -> float:
-    f_left = fn(left)
-    f_right = fn(right)
-    if f_left == 0.0:
-        return left
-    if f_right == 0.0:
-        return right
-    if f_left * f_right > 0.0:
-        raise ValueError("Bisection interval does not bracket a root")
-
-    lo, hi = left, right
-    flo, fhi = f_left, f_right
-    for _ in range(max_iter):
-        mid = 0.5 * (lo + hi)
-        fmid = fn(mid)
-        if abs(fmid) <= tol_abs:
-            return mid
-        if flo * fmid <= 0.0:
-            hi = mid
-            fhi = fmid
-        else:
-            lo = mid
-            flo = fmid
-    return 0.5 * (lo + hi)
-
-
-def _thermal_crossovers(
+    xtol_rel: float = 1e-13,
+    k1_scale: float = 0.2,
+    n0: int = 1,
+) -> np.ndarray:
+    """
+    Refine many bracketed roots of fn at once with ITP (interpolate, truncate, project).
+
+    fn is called on the whole vector of trial points each iteration. Every bracket keeps the
+    bisection worst case (plus n0 steps) while converging superlinearly on smooth roots.
+    """
+    a = np.array(left, dtype=float)
+    b = np.array(right, dtype=float)
+    # Orient every bracket so that y(a) < 0 < y(b).
+    sign = np.where(f_right > 0.0, 1.0, -1.0)
+    ya = sign * np.asarray(f_left, dtype=float)
+    yb = sign * np.asarray(f_right, dtype=float)
+    roots = np.where(ya == 0.0, a, np.where(yb == 0.0, b, 0.5 * (a + b)))
+    active = (ya < 0.0) & (yb > 0.0)
+
+    eps = np.maximum(xtol_rel * np.maximum(np.abs(a), np.abs(b)), np.finfo(float).tiny)
+    width0 = np.maximum(b - a, 2.0 * eps)
+    n_max = np.ceil(np.log2(width0 / (2.0 * eps))) + n0
+    k1 = k1_scale / width0
+    for j in range(max_iter):
+        if not np.any(active):
+            break
+        width = b - a
+        x_half = 0.5 * (a + b)
+        r = np.maximum(eps * 2.0 ** (n_max - j) - 0.5 * width, 0.0)
+        delta = k1 * width**2
+        x_f = (yb * a - ya * b) / (yb - ya)
+        direction = np.sign(x_half - x_f)
+        x_t = np.where(delta <= np.abs(x_half - x_f), x_f + direction * delta, x_half)
+        x = np.where(np.abs(x_t - x_half) <= r, x_t, x_half - direction * r)
+        x = np.where(active, x, roots)
+
+        y = sign * np.asarray(fn(x), dtype=float)
+        hit = active & (np.abs(y) <= tol_abs)
+        roots = np.where(hit, x, roots)
+        active &= ~hit
+        a = np.where(active & (y < 0.0), x, a)
+        ya = np.where(active & (y < 0.0), y, ya)
+        b = np.where(active & (y > 0.0), x, b)
+        yb = np.where(active & (y > 0.0), y, yb)
+        closed = active & (b - a <= 2.0 * eps)
+        roots = np.where(closed, 0.5 * (a + b), roots)
+        active &= ~closed
+
+    return np.where(active, 0.5 * (a + b), roots)
+
+
+def _thermal_intervals(
     *,
     R_m_grid: np.ndarray,
     q_expected: float,
     T_in_max: float,
     target: str,
     p: float,
-    sigma_allow: float,
-    k: float,
+    material: Material,
     epsilon: float,
     T_space: float,
     h_i: float,
-) -> tuple[float | None, float | None]:
-    g_vals = np.array(
-        [
-            _thermal_g(
-                float(r),
-                q_expected=q_expected,
-                T_in_max=T_in_max,
-                target=target,
-                p=p,
-                sigma_allow=sigma_allow,
-                k=k,
-                epsilon=epsilon,
-                T_space=T_space,
-                h_i=h_i,
-            )
-            for r in R_m_grid
-        ]
-    )
-    ok = g_vals <= 0.0
-    idx_true = np.where(ok)[0]
-    if len(idx_true) == 0:
-        return None, None
-
-    r_min = float(R_m_grid[idx_true[0]])
-    r_max = float(R_m_grid[idx_true[-1]])
+) -> list[tuple[float, float]]:
+    """All radius intervals with target temperature <= T_in_max, edges refined to the root of _thermal_g."""
 
-    def fn(r: float) -> float:
+    def fn(r):
         return _thermal_g(
             r,
             q_expected=q_expected,
             T_in_max=T_in_max,
             target=target,
             p=p,
-            sigma_allow=sigma_allow,
-            k=k,
+            material=material,
             epsilon=epsilon,
             T_space=T_space,
             h_i=h_i,
         )
 
-    # Refine lower boundary if it transitions from fail->pass.
-    i0 = idx_true[0]
-    if i0 > 0 and g_vals[i0 - 1] * g_vals[i0] <= 0.0:
-        r_min = _bisect_root(float(R_m_grid[i0 - 1]), float(R_m_grid[i0]), fn)
-
-    # Refine upper boundary if it transitions from pass->fail.
-    i1 = idx_true[-1]
-    if i1 < len(R_m_grid) - 1 and g_vals[i1] * g_vals[i1 + 1] <= 0.0:
-        r_max = _bisect_root(float(R_m_grid[i1]), float(R_m_grid[i1 + 1]), fn)
-
-    return r_min, r_max
+    g_vals = np.asarray(fn(R_m_grid), dtype=float)
+    ok = g_vals <= 0.0
+    if not np.any(ok):
+        return []
+
+    # Runs of passing grid points; starts/ends interior to the grid sit next to a sign change.
+    edges = np.diff(ok.astype(np.int8))
+    starts = np.flatnonzero(edges == 1) + 1
+    ends = np.flatnonzero(edges == -1)
+    if ok[0]:
+        starts = np.concatenate(([0], starts))
+    if ok[-1]:
+        ends = np.concatenate((ends, [len(R_m_grid) - 1]))
+
+    r_lo = R_m_grid[starts].astype(float)
+    r_hi = R_m_grid[ends].astype(float)
+    # Fail->pass and pass->fail transitions refined together in one batch.
+    inner_lo = starts > 0
+    inner_hi = ends < len(R_m_grid) - 1
+    left = np.concatenate((starts[inner_lo] - 1, ends[inner_hi]))
+    right = left + 1
+    if left.size:
+        roots = _itp_roots(R_m_grid[left], R_m_grid[right], g_vals[left], g_vals[right], fn)
+        n_lo = int(inner_lo.sum())
+        r_lo[inner_lo] = roots[:n_lo]
+        r_hi[inner_hi] = roots[n_lo:]
+    return [(float(lo), float(hi)) for lo, hi in zip(r_lo, r_hi)]
+
+
+def _combined_intervals(
+    thermal: list[tuple[float, float]], r_shield: float
+) -> list[tuple[float, float]]:
+    return [(max(lo, r_shield), hi) for lo, hi in thermal if hi >= max(lo, r_shield)]
 
 
 def _fmt_radius(r_m: float | None) -> str:
@@ -198,18 +218,23 @@ def _fmt_interval(r_min: float | None, r_max: float | None) -> str:
     return f"[{_fmt_radius(r_min)} .. {_fmt_radius(r_max)}]"
 
 
-def _material_iter(material_filter: str | None) -> Iterable[tuple[str, object]]:
+def _fmt_intervals(intervals: list[tuple[float, float]]) -> str:
+    if not intervals:
+        return "none"
+    return ", ".join(_fmt_interval(lo, hi) for lo, hi in intervals)
+
+
+def _material_iter(material_filter: str | None) -> Iterable[tuple[str, Material]]:
     if material_filter:
-        mat = MATERIAL_PRESETS[material_filter]
-        return [(material_filter, mat)]
-    return [(k, v) for k, v in MATERIAL_PRESETS.items()]
+        return [(material_filter, get_material(material_filter))]
+    return [(name, get_material(name)) for name in material_names()]
 
 
 def _parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Numeric crossover summary (no plots) across materials."
     )
-    parser.add_argument("--material", choices=sorted(MATERIAL_PRESETS.keys()), default=None)
+    parser.add_argument("--material", choices=material_names(), default=None)
     parser.add_argument("--p", type=float, default=101325.0)
     parser.add_argument("--epsilon", type=float, default=0.8)
     parser.add_argument("--epsilon_list", type=str, default=None)
@@ -252,34 +277,33 @@ def main() -> None:
     for material_name, mat in _material_iter(args.material):
         print(f"Material: {material_name}")
         print(f"  sigma_allow = {mat.sigma_allow:.6g} Pa, rho = {mat.rho:.6g} kg/m^3, k = {mat.k:.6g} W/m/K")
+        if mat.temperature_dependent:
+            print(
+                f"  tabulated: sigma_allow(T_in_max) = {mat.sigma_allow_at(args.T_in_max):.6g} Pa, "
+                f"k(T_in_max) = {mat.k_at(args.T_in_max):.6g} W/m/K (values above at 300 K)"
+            )
         for eps in eps_values:
             r_shield = shielding_radius_threshold(
                 mu_req=args.mu_req,
-                sigma_allow=mat.sigma_allow,
+                sigma_allow=mat.sigma_allow_at(args.T_in_max),
                 rho=mat.rho,
                 p=args.p,
             )
-            r_thermal_min, r_thermal_max = _thermal_crossovers(
+            thermal = _thermal_intervals(
                 R_m_grid=R_m_grid,
                 q_expected=args.q_expected,
                 T_in_max=args.T_in_max,
                 target=args.temp_constraint_target,
                 p=args.p,
-                sigma_allow=mat.sigma_allow,
-                k=mat.k,
+                material=mat,
                 epsilon=eps,
                 T_space=args.T_space,
                 h_i=h_i,
             )
+            combined = _combined_intervals(thermal, r_shield)
 
-            combined_min = None
-            combined_max = None
-            if r_thermal_min is not None and r_thermal_max is not None:
-                combined_min = max(r_shield, r_thermal_min)
-                combined_max = r_thermal_max
-                if combined_min > combined_max:
-                    combined_min = None
-                    combined_max = None
+            r_thermal_min, r_thermal_max = (thermal[0][0], thermal[-1][1]) if thermal else (None, None)
+            combined_min, combined_max = (combined[0][0], combined[-1][1]) if combined else (None, None)
 
             print(f"  epsilon = {eps:g}")
             print(f"    shielding crossover (min R): {_fmt_radius(r_shield)}")
@@ -291,6 +315,9 @@ def main() -> None:
                 "    combined feasible interval (thermal & shielding): "
                 f"{_fmt_interval(combined_min, combined_max)}"
             )
+            if len(thermal) > 1:
+                print(f"    thermal feasible intervals ({len(thermal)}): {_fmt_intervals(thermal)}")
+                print(f"    combined feasible intervals ({len(combined)}): {_fmt_intervals(combined)}")
         print("")
 
 
@@ -1,10 +1,18 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import lru_cache
+import json
 import math
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
 
 
 SIGMA_SB = 5.670374419e-8
+MATERIALS_FILE = Path(__file__).with_name("materials.json")
+REFERENCE_T = 300.0  # K; constant k/sigma_allow reported for tabulated materials
 
 
 @dataclass(frozen=True)
@@ -13,6 +21,23 @@ class Material:
     k: float
     rho: float
     sigma_allow: float
+    # Optional (T_K, value) tables; when set they replace the constant k / sigma_allow.
+    k_curve: tuple[tuple[float, ...], tuple[float, ...]] | None = None
+    sigma_curve: tuple[tuple[float, ...], tuple[float, ...]] | None = None
+
+    @property
+    def temperature_dependent(self) -> bool:
+        return self.k_curve is not None or self.sigma_curve is not None
+
+    def k_at(self, T):
+        if self.k_curve is None:
+            return self.k if np.ndim(T) == 0 else np.full(np.shape(T), self.k)
+        return _curve_interpolator(self.k_curve)(T)
+
+    def sigma_allow_at(self, T):
+        if self.sigma_curve is None:
+            return self.sigma_allow if np.ndim(T) == 0 else np.full(np.shape(T), self.sigma_allow)
+        return _curve_interpolator(self.sigma_curve)(T)
 
 
 MATERIAL_PRESETS = {
@@ -21,6 +46,72 @@ MATERIAL_PRESETS = {
 }
 
 
+@lru_cache(maxsize=None)
+def _curve_interpolator(curve: tuple[tuple[float, ...], tuple[float, ...]]) -> Callable:
+    T_tab = np.asarray(curve[0], dtype=float)
+    v_tab = np.asarray(curve[1], dtype=float)
+
+    def interp(T):
+        # Piecewise linear, clamped to the end values outside the table.
+        out = np.interp(T, T_tab, v_tab)
+        return float(out) if np.ndim(out) == 0 else out
+
+    return interp
+
+
+def _material_from_record(name: str, rec: dict) -> Material:
+    T = tuple(float(v) for v in rec["T"])
+    if len(T) < 2 or any(b <= a for a, b in zip(T, T[1:])):
+        raise ValueError(f"{MATERIALS_FILE.name}: {name}: 'T' must be strictly increasing with >= 2 points")
+    curves = {}
+    for key in ("k", "sigma_allow"):
+        vals = rec[key]
+        if isinstance(vals, (int, float)):
+            curves[key] = None
+            continue
+        vals = tuple(float(v) for v in vals)
+        if len(vals) != len(T) or min(vals) <= 0.0:
+            raise ValueError(f"{MATERIALS_FILE.name}: {name}: '{key}' must match 'T' in length and be > 0")
+        curves[key] = (T, vals)
+    k_ref = float(rec["k"]) if curves["k"] is None else float(np.interp(REFERENCE_T, T, curves["k"][1]))
+    sigma_ref = (
+        float(rec["sigma_allow"])
+        if curves["sigma_allow"] is None
+        else float(np.interp(REFERENCE_T, T, curves["sigma_allow"][1]))
+    )
+    return Material(
+        name=name,
+        k=k_ref,
+        rho=float(rec["rho"]),
+        sigma_allow=sigma_ref,
+        k_curve=curves["k"],
+        sigma_curve=curves["sigma_allow"],
+    )
+
+
+@lru_cache(maxsize=1)
+def _material_database() -> dict[str, Material]:
+    db = dict(MATERIAL_PRESETS)
+    with MATERIALS_FILE.open("r", encoding="utf-8") as f:
+        records = json.load(f)["materials"]
+    for name, rec in records.items():
+        if name in db:
+            raise ValueError(f"{MATERIALS_FILE.name}: {name} duplicates a built-in preset")
+        db[name] = _material_from_record(name, rec)
+    return db
+
+
+def material_names() -> list[str]:
+    return list(_material_database())
+
+
+def get_material(name: str) -> Material:
+    try:
+        return _material_database()[name]
+    except KeyError:
+        raise ValueError(f"Unknown material {name!r}; choose from {material_names()}") from None
+
+
 def pressure_thickness(R_m: float, p: float, sigma_allow: float) -> float:
     return p * R_m / (2.0 * sigma_allow)
 
@@ -61,3 +152,46 @@ def temperatures(
 def shielding_radius_threshold(mu_req: float, sigma_allow: float, rho: float, p: float) -> float:
     return (2.0 * sigma_allow * mu_req) / (rho * p)
 
+
+def material_temperatures(
+    *,
+    material: Material,
+    R_m,
+    qppp,
+    p: float,
+    epsilon: float,
+    T_space: float,
+    h_i: float,
+    k: float | None = None,
+    sigma_allow: float | None = None,
+    max_iter: int = 50,
+    tol_abs: float = 1e-9,
+):
+    """
+    temperatures() with wall properties taken from the material at its own temperature.
+
+    k is evaluated at the mean wall temperature and sigma_allow (hence the pressure thickness) at the inner
+    surface, the hottest point of the wall. T_out does not depend on the wall, so only T_in_surf is iterated
+    (fixed point, element-wise). Explicit k / sigma_allow override the curves. Returns
+    (T_in_surf, T_air, T_out, k_wall, sigma_wall).
+    """
+    T_out = t_out_from_flux(q_flux_w_m2=q_flux(R_m=R_m, qppp=qppp), epsilon=epsilon, T_space=T_space)
+    T_in = T_out
+    for _ in range(max_iter if material.temperature_dependent else 1):
+        k_wall = material.k_at(0.5 * (T_in + T_out)) if k is None else k
+        sigma_wall = material.sigma_allow_at(T_in) if sigma_allow is None else sigma_allow
+        T_in_new, T_air, _ = temperatures(
+            R_m=R_m,
+            qppp=qppp,
+            p=p,
+            sigma_allow=sigma_wall,
+            k=k_wall,
+            epsilon=epsilon,
+            T_space=T_space,
+            h_i=h_i,
+        )
+        converged = np.all(np.abs(T_in_new - T_in) <= tol_abs)
+        T_in = T_in_new
+        if converged:
+            break
+    return T_in, T_air, T_out, k_wall, sigma_wall
@@ -7,8 +7,8 @@ from pathlib import Path
 import matplotlib.pyplot as plt
 import numpy as np
 
-from hab_sphere.physics import MATERIAL_PRESETS
-from hab_sphere.solve import solve_qppp_max
+from hab_sphere.physics import get_material, material_names
+from hab_sphere.solve import solve_qppp_max_material
 
 MIN_VALID_R_KM = 0.1
 
@@ -45,7 +45,7 @@ def _parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Sanity plot: total Q versus radius, including allowable Q from thermal limit."
     )
-    parser.add_argument("--material", choices=sorted(MATERIAL_PRESETS.keys()), default="steel")
+    parser.add_argument("--material", choices=material_names(), default="steel")
     parser.add_argument("--p", type=float, default=101325.0)
     parser.add_argument("--sigma_allow", type=float, default=None)
     parser.add_argument("--k", type=float, default=None)
@@ -76,9 +76,7 @@ def main() -> None:
     if args.R_max_km <= args.R_min_km:
         raise ValueError(f"R_max_km must be greater than R_min_km; got {args.R_max_km} <= {args.R_min_km}")
 
-    mat = MATERIAL_PRESETS[args.material]
-    sigma_allow = mat.sigma_allow if args.sigma_allow is None else args.sigma_allow
-    k = mat.k if args.k is None else args.k
+    mat = get_material(args.material)
     h_i = _parse_h_i(args.h_i)
     out_dir = args.out_dir if args.out_dir is not None else Path(args.material)
     out_dir.mkdir(parents=True, exist_ok=True)
@@ -87,21 +85,17 @@ def main() -> None:
     R_km = R_m / 1000.0
     volume = (4.0 / 3.0) * math.pi * R_m**3
 
-    qppp_max = np.array(
-        [
-            solve_qppp_max(
-                R_m=float(r),
-                T_in_max=args.T_in_max,
-                target=args.temp_constraint_target,
-                p=args.p,
-                sigma_allow=sigma_allow,
-                k=k,
-                epsilon=args.epsilon,
-                T_space=args.T_space,
-                h_i=h_i,
-            )
-            for r in R_m
-        ]
+    qppp_max = solve_qppp_max_material(
+        R_m=R_m,
+        T_in_max=args.T_in_max,
+        target=args.temp_constraint_target,
+        p=args.p,
+        material=mat,
+        epsilon=args.epsilon,
+        T_space=args.T_space,
+        h_i=h_i,
+        k=args.k,
+        sigma_allow=args.sigma_allow,
     )
 
     Q_expected = args.q_expected * volume
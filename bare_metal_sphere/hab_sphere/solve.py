@@ -1,42 +1,114 @@
 from __future__ import annotations
 
-from typing import Callable
+import math
 
-from hab_sphere.physics import temperatures
+import numpy as np
 
+from hab_sphere.physics import (
+    SIGMA_SB,
+    Material,
+    material_temperatures,
+    pressure_thickness,
+    q_flux,
+    temperatures,
+)
 
-def _target_temp(
+EPS = float(np.finfo(float).eps)
+
+
+def _expansion_cap(q_high_init: float, q_hard_cap: float, max_expand_iters: int) -> float:
+    # Value the original doubling search stops at when the constraint never binds below q_hard_cap.
+    q_high = q_high_init
+    for _ in range(max_expand_iters):
+        if q_high >= q_hard_cap:
+            break
+        q_high *= 2.0
+    return q_high
+
+
+def _thermal_coefficients(
     *,
     target: str,
+    R_m,
+    p: float,
+    sigma_allow: float,
+    k: float,
+    epsilon: float,
+    h_i: float,
+):
+    """
+    Coefficients (a, c) of the target temperature written in u = T_out.
+
+    a*qppp = u^4 - T_space^4 is the radiation balance and the target temperature is u + c*(u^4 - T_space^4), with c*a
+    the conduction drop per unit qppp minus, for target="air", the convection drop.
+    """
+    if target not in ("inner_surface", "air"):
+        raise ValueError(f"Unknown temp target: {target}")
+    flux_per_q = q_flux(R_m=R_m, qppp=1.0)
+    a = flux_per_q / (epsilon * SIGMA_SB)
+    b = flux_per_q * pressure_thickness(R_m=R_m, p=p, sigma_allow=sigma_allow) / k
+    if target == "air" and not math.isinf(h_i):
+        b = b - flux_per_q / h_i
+    return a, b / a
+
+
+def solve_qppp_max(
+    *,
     R_m: float,
-    qppp: float,
+    T_in_max: float,
+    target: str,
     p: float,
     sigma_allow: float,
     k: float,
     epsilon: float,
     T_space: float,
     h_i: float,
+    q_high_init: float = 1e-3,
+    q_hard_cap: float = 1e6,
+    max_expand_iters: int = 80,
+    max_iters: int = 50,
+    tol_abs: float = 1e-9,
 ) -> float:
-    T_in_surf, T_air, _ = temperatures(
-        R_m=R_m,
-        qppp=qppp,
-        p=p,
-        sigma_allow=sigma_allow,
-        k=k,
-        epsilon=epsilon,
-        T_space=T_space,
-        h_i=h_i,
+    """Scalar form of solve_qppp_max_array (same bracket, safeguarded Newton and edge cases)."""
+    a, c = _thermal_coefficients(
+        target=target, R_m=R_m, p=p, sigma_allow=sigma_allow, k=k, epsilon=epsilon, h_i=h_i
     )
-    if target == "inner_surface":
-        return T_in_surf
-    if target == "air":
-        return T_air
-    raise ValueError(f"Unknown temp target: {target}")
+    q_cap = _expansion_cap(q_high_init, q_hard_cap, max_expand_iters)
+    if T_space - T_in_max > 0.0:
+        return 0.0
 
+    T4 = T_space**4
 
-def solve_qppp_max(
+    def h(u: float) -> float:
+        return u + c * (u**4 - T4) - T_in_max
+
+    convex = c >= 0.0
+    lo = T_space
+    hi = max(T_in_max if convex else (-0.25 / c) ** (1.0 / 3.0), T_space)
+    if h(hi) < 0.0:
+        return q_cap
+
+    u = hi if convex else lo
+    for _ in range(max_iters):
+        h_u = h(u)
+        if h_u < 0.0:
+            lo = u
+        else:
+            hi = u
+        u_new = u - h_u / (1.0 + 4.0 * c * u**3)
+        if not lo <= u_new <= hi:
+            u_new = 0.5 * (lo + hi)
+        if abs(h_u) < tol_abs or abs(u_new - u) <= 4.0 * EPS * u:
+            break
+        u = u_new
+
+    qppp = (u - T_space) * (u + T_space) * (u * u + T_space**2) / a
+    return max(qppp, 0.0) if qppp <= q_cap else q_cap
+
+
+def solve_qppp_max_array(
     *,
-    R_m: float,
+    R_m: np.ndarray,
     T_in_max: float,
     target: str,
     p: float,
@@ -48,50 +120,236 @@ def solve_qppp_max(
     q_high_init: float = 1e-3,
     q_hard_cap: float = 1e6,
     max_expand_iters: int = 80,
-    max_bisect_iters: int = 120,
+    max_iters: int = 50,
     tol_abs: float = 1e-9,
-) -> float:
-    def f(qppp: float) -> float:
-        return (
-            _target_temp(
-                target=target,
-                R_m=R_m,
-                qppp=qppp,
-                p=p,
-                sigma_allow=sigma_allow,
-                k=k,
-                epsilon=epsilon,
-                T_space=T_space,
-                h_i=h_i,
-            )
-            - T_in_max
+) -> np.ndarray:
+    """
+    Largest qppp keeping the target temperature at or below T_in_max, for every radius in R_m.
+
+    In u = T_out (see _thermal_coefficients) the root of h(u) = u + c*(u^4 - T_space^4) - T_in_max is bracketed
+    analytically by [T_space, T_in_max] for c >= 0 (h convex, Newton from the right is monotone) and by
+    [T_space, u_peak] for c < 0 (h concave, Newton from the left is monotone; no crossing if h(u_peak) < 0).
+    Safeguarded Newton with the analytic derivative converges in a few steps; steps leaving the bracket
+    fall back to bisection.
+
+    Returns 0 where the limit is exceeded at zero load and the doubling-search cap (q_high_init doubled up to
+    q_hard_cap) where the constraint does not bind below it.
+    """
+    R_m = np.asarray(R_m, dtype=float)
+    a, c = _thermal_coefficients(
+        target=target, R_m=R_m, p=p, sigma_allow=sigma_allow, k=k, epsilon=epsilon, h_i=h_i
+    )
+    q_cap = _expansion_cap(q_high_init, q_hard_cap, max_expand_iters)
+    if T_space - T_in_max > 0.0:
+        return np.zeros_like(R_m)
+
+    T4 = T_space**4
+
+    def h(u: np.ndarray) -> np.ndarray:
+        return u + c * (u**4 - T4) - T_in_max
+
+    convex = c >= 0.0
+    u_peak = np.where(convex, T_in_max, np.cbrt(-0.25 / np.where(convex, -1.0, c)))
+    lo = np.full_like(R_m, T_space)
+    hi = np.maximum(u_peak, T_space)
+    has_root = h(hi) >= 0.0
+
+    u = np.where(convex, hi, lo)
+    active = has_root.copy()
+    for _ in range(max_iters):
+        if not np.any(active):
+            break
+        h_u = h(u)
+        lo = np.where(active & (h_u < 0.0), u, lo)
+        hi = np.where(active & (h_u >= 0.0), u, hi)
+        u_new = u - h_u / (1.0 + 4.0 * c * u**3)
+        u_new = np.where((u_new >= lo) & (u_new <= hi), u_new, 0.5 * (lo + hi))
+        done = (np.abs(h_u) < tol_abs) | (np.abs(u_new - u) <= 4.0 * EPS * u)
+        u = np.where(active & ~done, u_new, u)
+        active &= ~done
+
+    qppp = (u - T_space) * (u + T_space) * (u * u + T_space**2) / a
+    return np.where(has_root & (qppp <= q_cap), np.maximum(qppp, 0.0), q_cap)
+
+
+def _bracketed_material_limit(
+    *,
+    R_m: np.ndarray,
+    T_in_max: float,
+    target: str,
+    p: float,
+    material: Material,
+    epsilon: float,
+    T_space: float,
+    h_i: float,
+    k: float | None,
+    sigma_allow: float | None,
+    q_cap: float,
+    tol_T: float,
+    scan_points: int = 61,
+    max_iters: int = 100,
+) -> np.ndarray:
+    """
+    Limit qppp from a bracketed solve on the self-consistent target temperature, for radii where the fixed point
+    does not settle.
+
+    excess(q) = T_target(q) - T_in_max uses material_temperatures, so the wall properties are consistent with the
+    wall temperatures at every q, and excess(0) = T_space - T_in_max < 0. excess is scanned on a doubling grid up
+    to q_cap and its peak refined by golden section in log q; a peak below zero means the limit does not bind
+    (q_cap). Otherwise the first crossing below the peak is bisected to tol_T.
+    """
+    idx = 0 if target == "inner_surface" else 1
+
+    def excess(R, q):
+        temps = material_temperatures(
+            material=material, R_m=R, qppp=q, p=p, epsilon=epsilon, T_space=T_space, h_i=h_i, k=k, sigma_allow=sigma_allow
         )
+        return temps[idx] - T_in_max
 
-    q_low = 0.0
-    f_low = f(q_low)
-    if f_low > 0.0:
-        return 0.0
+    grid = q_cap * 2.0 ** np.arange(1 - scan_points, 1)
+    R_grid = np.repeat(R_m[:, None], grid.size, axis=1)
+    F = excess(R_grid, np.broadcast_to(grid, R_grid.shape))
 
-    q_high = q_high_init
-    f_high = f(q_high)
-    expand_iter = 0
-    while f_high <= 0.0 and q_high < q_hard_cap and expand_iter < max_expand_iters:
-        q_high *= 2.0
-        f_high = f(q_high)
-        expand_iter += 1
-
-    if f_high <= 0.0:
-        return q_high
-
-    for _ in range(max_bisect_iters):
-        q_mid = 0.5 * (q_low + q_high)
-        f_mid = f(q_mid)
-        if abs(f_mid) < tol_abs:
-            return q_mid
-        if f_mid <= 0.0:
-            q_low = q_mid
-        else:
-            q_high = q_mid
+    # Peak of excess: golden section in log q around the best grid point.
+    rows = np.arange(R_m.size)
+    j = np.argmax(F, axis=1)
+    log_a = np.log(grid[np.maximum(j - 1, 0)])
+    log_b = np.log(grid[np.minimum(j + 1, grid.size - 1)])
+    inv_phi = 0.5 * (math.sqrt(5.0) - 1.0)
+    for _ in range(max_iters):
+        x1 = log_b - inv_phi * (log_b - log_a)
+        x2 = log_a + inv_phi * (log_b - log_a)
+        left = excess(R_m, np.exp(x1)) >= excess(R_m, np.exp(x2))
+        log_b = np.where(left, x2, log_b)
+        log_a = np.where(left, log_a, x1)
+        if np.all(log_b - log_a <= 4.0 * EPS * np.maximum(np.abs(log_b), 1.0)):
+            break
+    q_peak = np.exp(0.5 * (log_a + log_b))
+    F_peak = np.maximum(excess(R_m, q_peak), F[rows, j])
+    binds = F_peak >= 0.0
 
-    return 0.5 * (q_low + q_high)
+    # First crossing: the first grid point at or above the limit, else the refined peak.
+    above = F >= 0.0
+    j0 = np.where(above.any(axis=1), np.argmax(above, axis=1), j)
+    hi = np.where(above.any(axis=1), grid[j0], q_peak)
+    lo = np.where(j0 > 0, grid[np.maximum(j0 - 1, 0)], 0.0)
+    lo = np.minimum(lo, hi)
+    for _ in range(max_iters):
+        mid = 0.5 * (lo + hi)
+        F_mid = excess(R_m, mid)
+        lo = np.where(F_mid < 0.0, mid, lo)
+        hi = np.where(F_mid < 0.0, hi, mid)
+        if np.all((np.abs(F_mid) <= tol_T) | (hi - lo <= 4.0 * EPS * hi) | ~binds):
+            break
+    return np.where(binds, lo, q_cap)
 
+
+def solve_qppp_max_material(
+    *,
+    R_m: np.ndarray,
+    T_in_max: float,
+    target: str,
+    p: float,
+    material: Material,
+    epsilon: float,
+    T_space: float,
+    h_i: float,
+    k: float | None = None,
+    sigma_allow: float | None = None,
+    q_high_init: float = 1e-3,
+    q_hard_cap: float = 1e6,
+    max_expand_iters: int = 80,
+    max_fixed_point_iters: int = 60,
+    rtol_T: float = 1e-6,
+) -> np.ndarray:
+    """
+    solve_qppp_max_array with temperature-dependent wall properties from the material.
+
+    k is evaluated at the mean wall temperature and sigma_allow at the inner surface (as in material_temperatures).
+    Wall temperatures start at T_in_max and alternate with the limit solve at frozen per-radius properties until
+    they reproduce themselves to rtol_T * T_in_max; radii whose step changes sign get their relaxation halved, so
+    most oscillating cases (target="air") still converge. Radii where the limit does not bind below the cap keep
+    the starting temperatures. For target="air" the air temperature is not monotone in qppp, so the binding
+    crossing can jump between "bound" and "unbound" as the properties change, and properties frozen at
+    T_in_max can hide a crossing that exists at the cooler self-consistent wall temperatures. Radii still
+    unsettled after max_fixed_point_iters, and radii left at the cap, are solved by _bracketed_material_limit
+    instead. Constant materials, or explicit k and sigma_allow, take a single solve. q_high_init, q_hard_cap
+    and max_expand_iters set the cap as in solve_qppp_max_array.
+    """
+    R_m = np.asarray(R_m, dtype=float)
+    tol_T = rtol_T * T_in_max
+    q_cap = _expansion_cap(q_high_init, q_hard_cap, max_expand_iters)
+
+    def properties(T_in: np.ndarray, T_out: np.ndarray) -> tuple:
+        k_wall = material.k_at(0.5 * (T_in + T_out)) if k is None else k
+        sigma_wall = material.sigma_allow_at(T_in) if sigma_allow is None else sigma_allow
+        return k_wall, sigma_wall
+
+    def solve(k_wall, sigma_wall) -> np.ndarray:
+        return solve_qppp_max_array(
+            R_m=R_m,
+            T_in_max=T_in_max,
+            target=target,
+            p=p,
+            sigma_allow=sigma_wall,
+            k=k_wall,
+            epsilon=epsilon,
+            T_space=T_space,
+            h_i=h_i,
+            q_high_init=q_high_init,
+            q_hard_cap=q_hard_cap,
+            max_expand_iters=max_expand_iters,
+        )
+
+    T_w = np.full_like(R_m, T_in_max)  # inner-surface and outer-surface temperatures used for the properties
+    T_o = np.full_like(R_m, T_in_max)
+    if not material.temperature_dependent or (k is not None and sigma_allow is not None):
+        return solve(*properties(T_w, T_o))
+
+    omega_w = np.ones_like(R_m)
+    omega_o = np.ones_like(R_m)
+    prev_step = np.zeros_like(R_m)
+    prev_step_o = np.zeros_like(R_m)
+    for _ in range(max_fixed_point_iters):
+        k_wall, sigma_wall = properties(T_w, T_o)
+        qppp = solve(k_wall, sigma_wall)
+        T_in, _, T_out = temperatures(
+            R_m=R_m,
+            qppp=qppp,
+            p=p,
+            sigma_allow=sigma_wall,
+            k=k_wall,
+            epsilon=epsilon,
+            T_space=T_space,
+            h_i=h_i,
+        )
+        unbound = qppp >= q_cap
+        step = np.where(unbound, T_in_max - T_w, T_in - T_w)
+        step_o = np.where(unbound, T_in_max - T_o, T_out - T_o)
+        if np.all(np.abs(step) <= tol_T) and np.all(np.abs(step_o) <= tol_T):
+            break
+        omega_w = np.where((step * prev_step < 0.0) & (np.abs(step) > tol_T), 0.5 * omega_w, omega_w)
+        omega_o = np.where((step_o * prev_step_o < 0.0) & (np.abs(step_o) > tol_T), 0.5 * omega_o, omega_o)
+        T_w = T_w + omega_w * step
+        T_o = T_o + omega_o * step_o
+        prev_step = step
+        prev_step_o = step_o
+
+    recheck = (np.abs(step) > tol_T) | (np.abs(step_o) > tol_T) | (qppp >= q_cap)
+    if np.any(recheck):
+        qppp = qppp.copy()
+        qppp[recheck] = _bracketed_material_limit(
+            R_m=R_m[recheck],
+            T_in_max=T_in_max,
+            target=target,
+            p=p,
+            material=material,
+            epsilon=epsilon,
+            T_space=T_space,
+            h_i=h_i,
+            k=k,
+            sigma_allow=sigma_allow,
+            q_cap=q_cap,
+            tol_T=tol_T,
+        )
+    return qppp
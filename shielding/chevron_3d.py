@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+3-D chevron transport with full azimuth and finite blade length.
+
+The x-z section is the connected chevron of monte_carlo_chevron.py (surface models). Along y the
+blades are finite: each blade has length blade_length and is followed by an end gap, repeating with
+period blade_length + end_gap. A crossing of a blade plane only attenuates when the ray's y at the
+crossing lands on a blade; otherwise the ray streams through the gap.
+
+Rays are processed in chunks and every tally is a running sum, so the sample count is limited by
+run time rather than memory. Each chunk also evaluates the infinite-blade (2-D section) result on
+the same rays, so the edge leakage T_3d - T_infinite is a paired estimate with a small error bar.
+With --end-gap 0 and --chunk-size >= --samples the infinite-blade numbers are identical to
+monte_carlo_chevron.py for the same seed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+from dataclasses import dataclass, field
+
+import numpy as np
+
+import monte_carlo_chevron as mc
+
+CROSSING_BLOCK = 64  # crossings expanded per ray per pass; the mean count is ~3, so one pass covers almost all rays
+HIT_BINS = 6
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="3-D chevron Monte Carlo with finite blade length and end gaps.")
+    p.add_argument("--samples", type=int, default=1_000_000, help="Total number of rays (1e8 is fine)")
+    p.add_argument("--chunk-size", type=int, default=1_000_000, help="Rays evaluated per vectorized chunk")
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--tau-flat", type=float, default=5.0)
+    p.add_argument("--L", type=float, default=1.0, help="Depth d in x")
+    p.add_argument("--pitch", type=float, default=0.5, help="Input pitch p in z")
+    p.add_argument("--thickness", type=float, default=0.03, help="Blade attenuation thickness t")
+    p.add_argument("--theta-deg", type=float, default=45.0, help="Slat angle")
+    p.add_argument("--model", type=str, default="surface", choices=["surface", "surface_extended"])
+    p.add_argument(
+        "--center-extension-frac",
+        type=float,
+        default=0.0,
+        help="For model=surface_extended: asymmetric '/'-branch extension fraction of L.",
+    )
+    p.add_argument("--tau-reference", type=str, default="blade", choices=["blade", "slab"])
+    p.add_argument("--enforce-no-miss", action="store_true")
+    p.add_argument("--pitch-margin", type=float, default=1e-6)
+    p.add_argument("--blade-length", type=float, default=10.0, help="Blade length along y")
+    p.add_argument("--end-gap", type=float, default=0.0, help="Open gap along y between consecutive blades")
+    p.add_argument(
+        "--max-crossings",
+        type=int,
+        default=4096,
+        help="Per-branch cap on crossings followed per ray; grazing rays beyond it are reported as truncated.",
+    )
+    a = p.parse_args()
+
+    if a.samples < 1:
+        p.error("--samples must be >= 1")
+    if a.chunk_size < 1:
+        p.error("--chunk-size must be >= 1")
+    if a.tau_flat <= 0:
+        p.error("--tau-flat must be > 0")
+    if a.L <= 0:
+        p.error("--L must be > 0")
+    if a.pitch <= 0:
+        p.error("--pitch must be > 0")
+    if a.thickness <= 0:
+        p.error("--thickness must be > 0")
+    if not (0.0 < a.theta_deg < 90.0):
+        p.error("--theta-deg must be in (0, 90)")
+    if a.center_extension_frac < 0:
+        p.error("--center-extension-frac must be >= 0")
+    if a.blade_length <= 0:
+        p.error("--blade-length must be > 0")
+    if a.end_gap < 0:
+        p.error("--end-gap must be >= 0")
+    if a.max_crossings < 1:
+        p.error("--max-crossings must be >= 1")
+    return a
+
+
+def hemisphere_directions_3d(u: np.ndarray, v: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Cosine-law directions (ux, uy, uz); (ux, uz) match mc.hemisphere_directions for the same (u, v)."""
+    ux, uz = mc.hemisphere_directions(u, v)
+    uy = np.sqrt(np.maximum(0.0, 1.0 - u)) * np.sin(2.0 * np.pi * v)
+    return ux, uy, uz
+
+
+def branch_lattice(c: np.ndarray, s: np.ndarray, x_lo: float, x_hi: float, p: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Centerline crossings of one branch family: y(x) = c + s*x meets k*p for x in [x_lo, x_hi].
+
+    Returns (k_start, n) so that the crossings are k = k_start .. k_start + n - 1.
+    """
+    y0 = c + s * x_lo
+    y1 = c + s * x_hi
+    k_start = np.ceil(np.minimum(y0, y1) / p)
+    n = mc.count_integer_hits_array(y0, y1, p)
+    return k_start, n
+
+
+def material_crossings(
+    c: np.ndarray,
+    s: np.ndarray,
+    k_start: np.ndarray,
+    n: np.ndarray,
+    x_lo: float,
+    y0: np.ndarray,
+    ry: np.ndarray,
+    blade_length: float,
+    period: float,
+    max_crossings: int,
+    p: float,
+) -> np.ndarray:
+    """
+    Count the crossings of one branch family that land on a blade in y.
+
+    The ragged set of crossings is expanded with np.repeat, CROSSING_BLOCK per ray per pass, so the
+    work is proportional to the total number of crossings rather than to the largest one.
+    """
+    limit = np.minimum(n, max_crossings)
+    hits = np.zeros(n.size, dtype=np.int64)
+    done = np.zeros(n.size, dtype=np.int64)
+    active = np.flatnonzero(limit > 0)
+    while active.size:
+        take = np.minimum(limit[active] - done[active], CROSSING_BLOCK)
+        ray = np.repeat(active, take)
+        pos = np.repeat(np.arange(active.size), take)
+        local = np.arange(ray.size) - np.repeat(np.cumsum(take) - take, take)
+        k = k_start[ray] + done[ray] + local
+        s_r = s[ray]
+        # s == 0 only for a ray running exactly along a branch; its single crossing sits at x_lo.
+        x = np.divide(k * p - c[ray], s_r, out=np.full(ray.size, x_lo), where=s_r != 0.0)
+        on_blade = np.mod(y0[ray] + ry[ray] * x, period) < blade_length
+        hits[active] += np.bincount(pos, weights=on_blade, minlength=active.size).astype(np.int64)
+        done[active] += take
+        active = active[done[active] < limit[active]]
+    return hits
+
+
+@dataclass
+class Tally:
+    """Running sums over chunks."""
+
+    n: int = 0
+    sum_t3d: float = 0.0
+    sum_t3d_sq: float = 0.0
+    sum_tinf: float = 0.0
+    sum_tinf_sq: float = 0.0
+    sum_diff_sq: float = 0.0
+    sum_t_flat: float = 0.0
+    no_hit_3d: int = 0
+    no_hit_inf: int = 0
+    truncated: int = 0
+    sum_hits: int = 0
+    hist: np.ndarray = field(default_factory=lambda: np.zeros(HIT_BINS + 1, dtype=np.int64))
+
+    def add(self, t3d: np.ndarray, tinf: np.ndarray, t_flat: np.ndarray, hits: np.ndarray, hits_inf: np.ndarray, truncated: np.ndarray) -> None:
+        self.n += t3d.size
+        self.sum_t3d += float(np.sum(t3d))
+        self.sum_t3d_sq += float(np.sum(t3d * t3d))
+        self.sum_tinf += float(np.sum(tinf))
+        self.sum_tinf_sq += float(np.sum(tinf * tinf))
+        diff = t3d - tinf
+        self.sum_diff_sq += float(np.sum(diff * diff))
+        self.sum_t_flat += float(np.sum(t_flat))
+        self.no_hit_3d += int(np.count_nonzero(hits == 0))
+        self.no_hit_inf += int(np.count_nonzero(hits_inf == 0))
+        self.truncated += int(np.count_nonzero(truncated))
+        self.sum_hits += int(np.sum(hits))
+        self.hist += np.bincount(np.minimum(hits, HIT_BINS), minlength=HIT_BINS + 1)
+
+    def mean_stderr(self, total: float, total_sq: float) -> tuple[float, float]:
+        mean = total / self.n
+        if self.n < 2:
+            return mean, math.inf
+        var = max(0.0, (total_sq - self.n * mean * mean) / (self.n - 1))
+        return mean, math.sqrt(var / self.n)
+
+
+def run_chunk(
+    a: argparse.Namespace,
+    params: mc.Params,
+    rng: np.random.Generator,
+    n: int,
+    pitch: float,
+    lam: float,
+    period: float,
+    tally: Tally,
+) -> None:
+    u = rng.random(n)
+    v = rng.random(n)
+    ux, uy, uz = hemisphere_directions_3d(u, v)
+    z0_unit = rng.random(n)
+    y_unit = rng.random(n)
+
+    z0 = mc.z0_at_x0(params, ux, uz, z0_unit, a.L, pitch)
+    ry = uy / ux
+    x1_lo, x1_hi, x2_lo, x2_hi = mc.surface_branch_ranges(params, a.L)
+    y0 = y_unit * period - ry * x1_lo  # y at x=0 from a uniform y entry at the exposed plane
+
+    theta = math.radians(a.theta_deg)
+    m = math.tan(theta)
+    q = uz / ux
+    c1 = z0
+    s1 = q - m
+    c2 = z0 - m * a.L
+    s2 = q + m
+    k1, n1 = branch_lattice(c1, s1, x1_lo, x1_hi, pitch)
+    k2, n2 = branch_lattice(c2, s2, x2_lo, x2_hi, pitch)
+
+    if a.end_gap > 0.0:
+        h1 = material_crossings(c1, s1, k1, n1, x1_lo, y0, ry, a.blade_length, period, a.max_crossings, pitch)
+        h2 = material_crossings(c2, s2, k2, n2, x2_lo, y0, ry, a.blade_length, period, a.max_crossings, pitch)
+        truncated = (n1 > a.max_crossings) | (n2 > a.max_crossings)
+    else:
+        h1, h2 = n1, n2
+        truncated = np.zeros(n, dtype=bool)
+
+    dot1 = np.maximum(np.abs(-math.sin(theta) * ux + math.cos(theta) * uz), 1e-12)
+    dot2 = np.maximum(np.abs(+math.sin(theta) * ux + math.cos(theta) * uz), 1e-12)
+    l_inf = n1 * (a.thickness / dot1) + n2 * (a.thickness / dot2)
+    l_3d = h1 * (a.thickness / dot1) + h2 * (a.thickness / dot2)
+    tally.add(
+        np.exp(-lam * l_3d),
+        np.exp(-lam * l_inf),
+        np.exp(-a.tau_flat / ux),
+        h1 + h2,
+        n1 + n2,
+        truncated,
+    )
+
+
+def main() -> None:
+    a = parse_args()
+
+    params = mc.default_params(
+        n_samples=a.samples,
+        seed=a.seed,
+        tau_flat=a.tau_flat,
+        L=a.L,
+        p=a.pitch,
+        t=a.thickness,
+        theta_deg=a.theta_deg,
+        model=a.model,
+        tau_reference=a.tau_reference,
+        enforce_no_miss=a.enforce_no_miss,
+        pitch_margin=a.pitch_margin,
+        center_extension_frac=a.center_extension_frac,
+    )
+
+    p_eff, p_lim = mc.effective_pitch(params, a.L, a.thickness)
+    lam = mc.lambda_from_params(params, a.thickness, a.L)
+    period = a.blade_length + a.end_gap
+
+    rng = np.random.default_rng(a.seed)
+    tally = Tally()
+    for start in range(0, a.samples, a.chunk_size):
+        run_chunk(a, params, rng, min(a.chunk_size, a.samples - start), p_eff, lam, period, tally)
+
+    t_flat_an = mc.flat_transmission_analytic(a.tau_flat)
+    t3d, t3d_err = tally.mean_stderr(tally.sum_t3d, tally.sum_t3d_sq)
+    tinf, tinf_err = tally.mean_stderr(tally.sum_tinf, tally.sum_tinf_sq)
+    delta = t3d - tinf
+    _, delta_err = tally.mean_stderr(delta * tally.n, tally.sum_diff_sq)
+
+    print("Connected Chevron 3-D Monte Carlo")
+    print(f"samples={a.samples} seed={a.seed} chunk_size={a.chunk_size}")
+    print(
+        f"geometry: model={a.model}, L={a.L:.6g}, p_input={a.pitch:.6g}, p_effective={p_eff:.6g}, "
+        f"t={a.thickness:.6g}, theta={a.theta_deg:.6g} deg"
+    )
+    print(f"blade_length={a.blade_length:.6g} end_gap={a.end_gap:.6g} y_period={period:.6g}")
+    print(f"enforce_no_miss={a.enforce_no_miss}")
+    if a.model == "surface_extended":
+        print(f"center_extension_frac={a.center_extension_frac:.6g}")
+    print(f"pitch_no_miss_limit_conservative={p_lim:.10f}")
+    print(f"tau_flat={a.tau_flat:.6g}")
+    print(f"tau_reference={a.tau_reference}")
+    print(f"lambda={lam:.6g}")
+    print(f"T_flat_analytic={t_flat_an:.10f}")
+    print(f"T_flat_MC={tally.sum_t_flat / tally.n:.10f}")
+    print(f"T_chevron_3d={t3d:.10f}")
+    print(f"T_chevron_3d_stderr={t3d_err:.10g}")
+    print(f"T_chevron_infinite_blade={tinf:.10f}")
+    print(f"T_chevron_infinite_blade_stderr={tinf_err:.10g}")
+    print(f"edge_leakage_delta_T={delta:.10g}")
+    print(f"edge_leakage_delta_T_stderr={delta_err:.10g}")
+    print(f"delta_T_chevron_3d_minus_flat={t3d - t_flat_an:.10f}")
+    print(f"P_no_hit_3d={tally.no_hit_3d / tally.n:.10f}")
+    print(f"P_no_hit_infinite_blade={tally.no_hit_inf / tally.n:.10f}")
+    for k in range(HIT_BINS):
+        print(f"P_hit_{k}={tally.hist[k] / tally.n:.10f}")
+    print(f"P_hit_{HIT_BINS}plus={tally.hist[HIT_BINS] / tally.n:.10f}")
+    print(f"mean_hits={tally.sum_hits / tally.n:.10f}")
+    print(f"P_truncated={tally.truncated / tally.n:.3g}")
+
+
+if __name__ == "__main__":
+    main()
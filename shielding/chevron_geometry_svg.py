@@ -1,5 +1,10 @@
 #!/usr/bin/env python3
-"""Render chevron geometry + sample rays to SVG, with per-ray evaluated material thickness/path."""
+"""Render chevron geometry + sample rays to SVG, with per-ray evaluated material thickness/path.
+
+One chevron period is defined once and tiled with an SVG pattern, and the file is streamed, so drawings of
+many periods stay small and fast. At most --max-drawn-periods are drawn so each period stays readable; the
+header gives the full repeat count.
+"""
 
 from __future__ import annotations
 
@@ -10,6 +15,8 @@ import numpy as np
 
 import monte_carlo_chevron as mc
 
+HIT_COLORS = ("#999999", "#0a58ca", "#198754", "#e6a100", "#d63384", "#6f42c1", "#212529")  # h = 0 .. 5, 6+
+
 
 def parse_args() -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Draw connected chevron geometry and labeled sample rays.")
@@ -26,13 +33,34 @@ def parse_args() -> argparse.Namespace:
     )
     p.add_argument("--tau-flat", type=float, default=5.0)
     p.add_argument("--tau-reference", type=str, default="blade", choices=["blade", "slab"])
-    p.add_argument("--num-rays", type=int, default=14, help="How many dotted rays to show")
+    p.add_argument("--num-rays", type=int, default=14, help="How many dotted rays to show (coloured by hit count)")
     p.add_argument("--seed", type=int, default=7)
-    p.add_argument("--periods", type=int, default=3, help="How many z periods to draw")
+    p.add_argument("--periods", type=int, default=3, help="How many z periods the stack has")
+    p.add_argument(
+        "--max-drawn-periods",
+        type=int,
+        default=40,
+        help="Most periods to draw; the geometry repeats, so a taller stack is drawn as this many and labelled",
+    )
     p.add_argument("--enforce-no-miss", action="store_true")
     p.add_argument("--pitch-margin", type=float, default=1e-6)
+    p.add_argument(
+        "--max-labels",
+        type=int,
+        default=20,
+        help="Most period labels to write; ray labels are only written when --num-rays is at most this",
+    )
     p.add_argument("--out", type=str, default="chevron_geometry.svg")
-    return p.parse_args()
+    a = p.parse_args()
+    if a.periods < 1:
+        p.error("--periods must be >= 1")
+    if a.num_rays < 0:
+        p.error("--num-rays must be >= 0")
+    if a.max_drawn_periods < 1:
+        p.error("--max-drawn-periods must be >= 1")
+    if a.max_labels < 1:
+        p.error("--max-labels must be >= 1")
+    return a
 
 
 def sx(x: float, width: float, margin: float, L: float) -> float:
@@ -55,7 +83,7 @@ def text(x: float, y: float, s: str, style: str) -> str:
 def main() -> None:
     a = parse_args()
 
-    params = mc.Params(
+    params = mc.default_params(
         n_samples=1,
         seed=a.seed,
         tau_flat=a.tau_flat,
@@ -67,15 +95,6 @@ def main() -> None:
         tau_reference=a.tau_reference,
         enforce_no_miss=a.enforce_no_miss,
         pitch_margin=a.pitch_margin,
-        require_no_hit=False,
-        solve_thickness_for_flat=False,
-        solve_depth_for_flat=False,
-        t_min=0.001,
-        t_max=0.3,
-        d_min=0.05,
-        d_max=5.0,
-        solve_iters=28,
-        describe_variables=False,
         center_extension_frac=a.center_extension_frac,
     )
 
@@ -87,8 +106,10 @@ def main() -> None:
     inner_w = W - 2 * margin
     inner_h = H - 2 * margin
 
+    # Beyond --max-drawn-periods the tile would shrink below a readable height (about 15 px at the cap).
+    periods = min(a.periods, a.max_drawn_periods)
     zmin = -0.25 * p_eff
-    zmax = (a.periods + 0.25) * p_eff
+    zmax = (periods + 0.25) * p_eff
     zspan = zmax - zmin
 
     ext = a.center_extension_frac * a.L if a.model == "surface_extended" else 0.0
@@ -111,121 +132,140 @@ def main() -> None:
     theta = math.radians(a.theta_deg)
     m = math.tan(theta)
 
-    parts = []
-    parts.append('<?xml version="1.0" encoding="UTF-8"?>')
-    parts.append(f'<svg xmlns="http://www.w3.org/2000/svg" width="{W}" height="{H}" viewBox="0 0 {W} {H}">')
-    parts.append('<rect x="0" y="0" width="100%" height="100%" fill="#ffffff"/>')
-
-    # Frame and axes.
-    x0 = sx_plot(x_min)
-    x_entry = sx_plot(0.0)
-    xL = sx_plot(a.L)
-    z0v = sz_plot(zmin)
-    z1v = sz_plot(zmax)
-    parts.append(line(x0, z0v, xL, z0v, "stroke:#444;stroke-width:1"))
-    parts.append(line(x0, z1v, xL, z1v, "stroke:#444;stroke-width:1"))
-    parts.append(line(x0, z0v, x0, z1v, "stroke:#444;stroke-width:1"))
-    parts.append(line(x_entry, z0v, x_entry, z1v, "stroke:#888;stroke-width:1;stroke-dasharray:3,3"))
-    parts.append(line(xL, z0v, xL, z1v, "stroke:#444;stroke-width:1"))
-
-    # Period guides.
-    for k in range(a.periods + 1):
-        zk = k * p_eff
-        yk = sz_plot(zk)
-        parts.append(line(x0, yk, xL, yk, "stroke:#ddd;stroke-width:1"))
-        parts.append(text(xL + 6, yk + 4, f"z={zk:.4f}", "font:12px monospace;fill:#666"))
-
-    # Chevron centerlines.
-    style_chev = "stroke:#d11;stroke-width:2;fill:none"
-    x1_lo, x1_hi = (-ext, 0.5 * a.L) if a.model == "surface_extended" else (0.0, 0.5 * a.L)
-    x2_lo, x2_hi = 0.5 * a.L, a.L
-    for k in range(-1, a.periods + 2):
-        zoff = k * p_eff
-        z1a = zoff + m * x1_lo
-        z1b = zoff + m * x1_hi
-        z2a = zoff + m * a.L - m * x2_lo
-        z2b = zoff + m * a.L - m * x2_hi
-        parts.append(line(sx_plot(x1_lo), sz_plot(z1a), sx_plot(x1_hi), sz_plot(z1b), style_chev))
-        parts.append(line(sx_plot(x2_lo), sz_plot(z2a), sx_plot(x2_hi), sz_plot(z2b), style_chev))
-
-    # Sample rays.
-    rng = np.random.default_rng(a.seed)
-    ux, uz = mc.sample_isotropic_hemisphere(rng, a.num_rays)
-    z0_unit = rng.random(a.num_rays)
-
-    for i in range(a.num_rays):
-        zstart = float(z0_unit[i] * p_eff + (i % a.periods) * p_eff)
-        q = float(uz[i] / ux[i])
-        x_ray_start = x_min
-        x_ray_end = a.L
-        zend = zstart + q * (x_ray_end - x_ray_start)
-        z_at_x0 = zstart - q * x_ray_start
-
-        # Evaluate material length for this specific ray.
-        li = mc.material_length(
-            params,
-            np.array([ux[i]]),
-            np.array([uz[i]]),
-            np.array([z_at_x0]),
-            a.L,
-            p_eff,
-            a.thickness,
-        )[0]
-        hi = mc.hit_count_distribution(
-            params,
-            np.array([ux[i]]),
-            np.array([uz[i]]),
-            np.array([z_at_x0]),
-            a.L,
-            p_eff,
+    with open(a.out, "w", encoding="utf-8") as out:
+        def emit(s: str) -> None:
+            out.write(s + "\n")
+
+        emit('<?xml version="1.0" encoding="UTF-8"?>')
+        emit(
+            f'<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" '
+            f'width="{W}" height="{H}" viewBox="0 0 {W} {H}">'
         )
-        htxt = int(hi[0]) if hi is not None else -1
-
-        x1 = sx_plot(x_ray_start)
-        y1 = sz_plot(zstart)
-        x2 = sx_plot(x_ray_end)
-        y2 = sz_plot(zend)
-        parts.append(line(x1, y1, x2, y2, "stroke:#0a58ca;stroke-width:1.4;stroke-dasharray:4,4"))
-
-        xm = 0.55 * x1 + 0.45 * x2
-        ym = 0.55 * y1 + 0.45 * y2 - 4
-        label = f"h={htxt}, Lmat={li:.4f}" if htxt >= 0 else f"Lmat={li:.4f}"
-        parts.append(text(xm, ym, label, "font:11px monospace;fill:#0a58ca"))
-
-    # Header labels.
-    parts.append(text(margin, 20, "Connected Chevron Geometry", "font:16px monospace;font-weight:bold;fill:#111"))
-    parts.append(
-        text(
-            margin,
-            36,
-            f"model={a.model}, L={a.L:.6g}, p_input={a.pitch:.6g}, p_effective={p_eff:.6g}, t={a.thickness:.6g}, theta={a.theta_deg:.6g}",
-            "font:12px monospace;fill:#333",
+
+        # One period of the chevron (plus copies of its neighbours that reach into the tile) is defined once
+        # and tiled with a pattern, so the file size does not grow with --periods.
+        tile_h = p_eff * scale
+        tile_y0 = sz_plot(p_eff)
+        x1_lo, x1_hi = (-ext, 0.5 * a.L) if a.model == "surface_extended" else (0.0, 0.5 * a.L)
+        x2_lo, x2_hi = 0.5 * a.L, a.L
+        z_reach = max(abs(m * x1_lo), abs(m * x1_hi), abs(m * (a.L - x2_lo)), abs(m * (a.L - x2_hi)))
+        k_reach = int(math.ceil(z_reach / p_eff)) + 1
+
+        def tile_y(z: float) -> float:
+            return sz_plot(z) - tile_y0
+
+        style_chev = "stroke:#d11;stroke-width:2;fill:none"
+        emit("<defs>")
+        emit('<g id="chevron-period">')
+        emit(line(sx_plot(x1_lo), tile_y(m * x1_lo), sx_plot(x1_hi), tile_y(m * x1_hi), style_chev))
+        emit(line(sx_plot(x2_lo), tile_y(m * a.L - m * x2_lo), sx_plot(x2_hi), tile_y(m * a.L - m * x2_hi), style_chev))
+        emit("</g>")
+        emit(
+            f'<pattern id="chevron-tile" patternUnits="userSpaceOnUse" x="0" y="{tile_y0:.3f}" '
+            f'width="{W}" height="{tile_h:.3f}">'
         )
-    )
-    parts.append(
-        text(
-            margin,
-            52,
-            f"pitch_no_miss_limit_conservative={p_lim:.10f}, enforce_no_miss={a.enforce_no_miss}, ext_frac={a.center_extension_frac:.4g}",
-            "font:12px monospace;fill:#333",
+        # Period guide on both tile edges so the two clipped half-strokes join up.
+        emit(line(x_pad, 0.0, x_pad + draw_w, 0.0, "stroke:#ddd;stroke-width:1"))
+        emit(line(x_pad, tile_h, x_pad + draw_w, tile_h, "stroke:#ddd;stroke-width:1"))
+        for k in range(-k_reach, k_reach + 1):
+            emit(f'<use xlink:href="#chevron-period" href="#chevron-period" y="{-k * tile_h:.3f}" />')
+        emit("</pattern>")
+        emit("</defs>")
+        emit('<rect x="0" y="0" width="100%" height="100%" fill="#ffffff"/>')
+
+        # Frame and axes.
+        x0 = sx_plot(x_min)
+        x_entry = sx_plot(0.0)
+        xL = sx_plot(a.L)
+        z0v = sz_plot(zmin)
+        z1v = sz_plot(zmax)
+        emit(f'<rect x="{x0:.3f}" y="{z1v:.3f}" width="{xL - x0:.3f}" height="{z0v - z1v:.3f}" fill="url(#chevron-tile)" />')
+        emit(line(x0, z0v, xL, z0v, "stroke:#444;stroke-width:1"))
+        emit(line(x0, z1v, xL, z1v, "stroke:#444;stroke-width:1"))
+        emit(line(x0, z0v, x0, z1v, "stroke:#444;stroke-width:1"))
+        emit(line(x_entry, z0v, x_entry, z1v, "stroke:#888;stroke-width:1;stroke-dasharray:3,3"))
+        emit(line(xL, z0v, xL, z1v, "stroke:#444;stroke-width:1"))
+
+        # Period labels, thinned so that at most --max-labels are written.
+        label_step = max(1, int(math.ceil((periods + 1) / a.max_labels)))
+        for k in range(0, periods + 1, label_step):
+            zk = k * p_eff
+            emit(text(xL + 6, sz_plot(zk) + 4, f"z={zk:.4f}", "font:12px monospace;fill:#666"))
+
+        # Sample rays, evaluated in one vectorized call and coloured by hit count.
+        if a.num_rays > 0:
+            rng = np.random.default_rng(a.seed)
+            ux, uz = mc.sample_isotropic_hemisphere(rng, a.num_rays)
+            z0_unit = rng.random(a.num_rays)
+            zstart = z0_unit * p_eff + (np.arange(a.num_rays) % periods) * p_eff
+            q = uz / ux
+            zend = zstart + q * (a.L - x_min)
+            z_at_x0 = zstart - q * x_min
+            lmat = mc.material_length(params, ux, uz, z_at_x0, a.L, p_eff, a.thickness)
+            hits = mc.hit_count_distribution(params, ux, uz, z_at_x0, a.L, p_eff)
+            show_labels = a.num_rays <= a.max_labels
+            for i in range(a.num_rays):
+                h = int(hits[i]) if hits is not None else -1
+                color = HIT_COLORS[min(h, len(HIT_COLORS) - 1)] if h >= 0 else "#0a58ca"
+                x1 = sx_plot(x_min)
+                y1 = sz_plot(float(zstart[i]))
+                x2 = sx_plot(a.L)
+                y2 = sz_plot(float(zend[i]))
+                emit(line(x1, y1, x2, y2, f"stroke:{color};stroke-width:1.4;stroke-dasharray:4,4"))
+                if show_labels:
+                    xm = 0.55 * x1 + 0.45 * x2
+                    ym = 0.55 * y1 + 0.45 * y2 - 4
+                    label = f"h={h}, Lmat={lmat[i]:.4f}" if h >= 0 else f"Lmat={lmat[i]:.4f}"
+                    emit(text(xm, ym, label, f"font:11px monospace;fill:{color}"))
+            if hits is not None:
+                for j, color in enumerate(HIT_COLORS):
+                    name = f"h={j}" if j < len(HIT_COLORS) - 1 else f"h>={j}"
+                    emit(text(W - margin - 60, 20 + 14 * j, name, f"font:12px monospace;fill:{color}"))
+
+        # Header labels.
+        emit(text(margin, 20, "Connected Chevron Geometry", "font:16px monospace;font-weight:bold;fill:#111"))
+        emit(
+            text(
+                margin,
+                36,
+                f"model={a.model}, L={a.L:.6g}, p_input={a.pitch:.6g}, p_effective={p_eff:.6g}, t={a.thickness:.6g}, theta={a.theta_deg:.6g}",
+                "font:12px monospace;fill:#333",
+            )
         )
-    )
-    if a.model == "surface_extended":
-        parts.append(
+        emit(
             text(
                 margin,
-                68,
-                "Dashed vertical line marks x=0 entry plane; frame includes left extension region.",
+                52,
+                f"pitch_no_miss_limit_conservative={p_lim:.10f}, enforce_no_miss={a.enforce_no_miss}, ext_frac={a.center_extension_frac:.4g}",
                 "font:12px monospace;fill:#333",
             )
         )
+        y_note = 68
+        if periods < a.periods:
+            emit(
+                text(
+                    margin,
+                    y_note,
+                    f"showing {periods} of {a.periods} periods; the stack repeats every p_effective={p_eff:.6g} in z",
+                    "font:12px monospace;fill:#333",
+                )
+            )
+            y_note += 16
+        if a.model == "surface_extended":
+            emit(
+                text(
+                    margin,
+                    y_note,
+                    "Dashed vertical line marks x=0 entry plane; frame includes left extension region.",
+                    "font:12px monospace;fill:#333",
+                )
+            )
 
-    parts.append("</svg>")
-
-    with open(a.out, "w", encoding="utf-8") as f:
-        f.write("\n".join(parts) + "\n")
+        emit("</svg>")
 
     print(f"Wrote {a.out}")
+    if periods < a.periods:
+        print(f"drawn_periods={periods} of {a.periods}")
     print(f"p_effective={p_eff:.10f}")
     print(f"pitch_no_miss_limit_conservative={p_lim:.10f}")
 
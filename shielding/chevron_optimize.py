@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Mass-optimal chevron geometry for flat-wall transmission targets.
+
+For each target optical depth tau the flat wall of the same material (attenuation lam per unit length) has
+T_target = 2*E3(tau) and mass tau/lam per unit area. A chevron geometry (theta, pitch, extension) is given the
+blade thickness t that reproduces T_target, solved with the noise-aware root solver, and its mass per unit
+area is t*M_geom (geometric_line_factor). Nelder-Mead minimizes that mass over the geometry. The
+minimum masses over the targets form the mass-vs-transmission Pareto front.
+
+Every evaluation reuses one ray set (common random numbers) or the deterministic quadrature, so the
+objective does not change between calls at the same geometry. It is still only piecewise smooth: hit
+counts are integers, so the mass jumps wherever a ray family gains or loses a blade crossing, and the
+simplex can stall on those steps or park on a corner of the box. The default estimator is the quadrature,
+and each optimum reports the bounds it sits on (on_bound) so that such corners are visible. The pitch is
+parameterized as a fraction of the no-miss limit, so every candidate satisfies the constraint. Surface
+models are scale-free (hit counts and chords do not change when depth and pitch scale together), so
+depth is held at --L rather than optimized.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import dataclasses
+import math
+
+import numpy as np
+
+import monte_carlo_chevron as mc
+
+# Nelder-Mead xatol on the unit box; an optimum this close to a bound is reported as sitting on it.
+BOUND_TOL = 1e-3
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Minimize chevron mass (t*M_geom) at flat-wall transmission targets.")
+    p.add_argument("--tau-targets", type=str, default="3,4,5,6,7", help="Comma-separated flat-wall optical depths")
+    p.add_argument("--lam", type=float, default=5.0, help="Material attenuation per unit length (flat mass = tau/lam)")
+    p.add_argument("--model", type=str, default="surface", choices=["surface", "surface_extended"])
+    p.add_argument("--L", type=float, default=1.0, help="Depth d in x (held fixed; surface models are scale-free)")
+    p.add_argument("--theta-min", type=float, default=20.0)
+    p.add_argument("--theta-max", type=float, default=70.0)
+    p.add_argument("--pitch-frac-min", type=float, default=0.3, help="Lower bound on pitch / no-miss limit")
+    p.add_argument("--ext-max", type=float, default=0.5, help="Upper bound on center_extension_frac (surface_extended)")
+    p.add_argument("--pitch-margin", type=float, default=1e-6)
+    p.add_argument("--estimator", type=str, default="quadrature", choices=["mc", "quadrature"])
+    p.add_argument("--samples", type=int, default=200_000)
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--sampling", type=str, default="sobol", choices=["random", "stratified", "sobol"])
+    p.add_argument("--t-min", type=float, default=1e-4, help="Thickness bracket for the per-geometry solve")
+    p.add_argument("--t-max", type=float, default=5.0)
+    p.add_argument("--solve-iters", type=int, default=28)
+    p.add_argument("--max-evals", type=int, default=80, help="Nelder-Mead geometry evaluations per target")
+    p.add_argument("--out", type=str, default=None, help="Optional CSV of the per-target optima")
+    a = p.parse_args()
+
+    try:
+        a.taus = [float(v) for v in a.tau_targets.split(",") if v.strip()]
+    except ValueError:
+        p.error("--tau-targets must be comma-separated numbers")
+    if not a.taus or any(tau <= 0 for tau in a.taus):
+        p.error("--tau-targets must be > 0")
+    if a.lam <= 0:
+        p.error("--lam must be > 0")
+    if a.L <= 0:
+        p.error("--L must be > 0")
+    if not (0.0 < a.theta_min < a.theta_max < 90.0):
+        p.error("need 0 < --theta-min < --theta-max < 90")
+    if not (0.0 < a.pitch_frac_min <= 1.0):
+        p.error("--pitch-frac-min must be in (0, 1]")
+    if not (0.0 <= a.ext_max <= 0.5):
+        p.error("--ext-max must be in [0, 0.5]")
+    if a.samples < 2:
+        p.error("--samples must be >= 2")
+    if not (0.0 < a.t_min < a.t_max):
+        p.error("need 0 < --t-min < --t-max")
+    if a.max_evals < 1:
+        p.error("--max-evals must be >= 1")
+    return a
+
+
+def base_params(a: argparse.Namespace) -> mc.Params:
+    return mc.default_params(
+        n_samples=a.samples,
+        seed=a.seed,
+        tau_flat=a.taus[0],
+        L=a.L,
+        p=1.0,
+        t=1.0,
+        model=a.model,
+        tau_reference="slab",
+        pitch_margin=a.pitch_margin,
+        solve_thickness_for_flat=True,
+        t_min=a.t_min,
+        t_max=a.t_max,
+        solve_iters=a.solve_iters,
+        sampling=a.sampling,
+        estimator=a.estimator,
+    )
+
+
+def geometry_params(base: mc.Params, theta_deg: float, pitch_frac: float, ext: float) -> mc.Params:
+    """Params for one candidate; the pitch is pitch_frac of the conservative no-miss limit."""
+    p_lim = mc.conservative_pitch_limit(base.L, base.t, theta_deg, base.model)
+    pitch = pitch_frac * max(1e-12, p_lim - base.pitch_margin)
+    return dataclasses.replace(base, theta_deg=theta_deg, p=pitch, center_extension_frac=ext)
+
+
+@dataclasses.dataclass(frozen=True)
+class Candidate:
+    theta_deg: float
+    pitch_frac: float
+    ext: float
+    pitch: float
+    t: float
+    t_stderr: float
+    m_geom: float
+    mass: float
+    t_chevron: float
+    t_chevron_stderr: float
+
+
+def solve_candidate(a: argparse.Namespace, base: mc.Params, evaluate, target: float, x: tuple[float, float, float]) -> Candidate | None:
+    theta_deg, pitch_frac, ext = x
+    params = geometry_params(base, theta_deg, pitch_frac, ext)
+    try:
+        root = mc.solve_monotone_root(a.t_min, a.t_max, lambda t: evaluate(params, t), target, a.solve_iters)
+    except SystemExit:
+        return None  # target not reachable inside the thickness bracket
+    m_geom = mc.geometric_line_factor(params, params.L, params.p)
+    return Candidate(
+        theta_deg=theta_deg,
+        pitch_frac=pitch_frac,
+        ext=ext,
+        pitch=params.p,
+        t=root.x,
+        t_stderr=root.x_stderr,
+        m_geom=m_geom,
+        mass=root.x * m_geom,
+        t_chevron=root.case.t_chevron,
+        t_chevron_stderr=root.case.t_stderr,
+    )
+
+
+def search_box(a: argparse.Namespace) -> tuple[np.ndarray, np.ndarray]:
+    """Lower and upper bounds of (theta, pitch_frac, ext); ext is pinned to 0 outside surface_extended."""
+    lo = np.array([a.theta_min, a.pitch_frac_min, 0.0])
+    hi = np.array([a.theta_max, 1.0, a.ext_max if a.model == "surface_extended" else 0.0])
+    return lo, hi
+
+
+def active_bounds(a: argparse.Namespace, c: Candidate) -> list[str]:
+    """Names of the free bounds the candidate sits on, to within the simplex tolerance (xatol) of the box."""
+    lo, hi = search_box(a)
+    x = np.array([c.theta_deg, c.pitch_frac, c.ext])
+    tol = BOUND_TOL * (hi - lo)
+    names = []
+    for name, xi, lo_i, hi_i, tol_i in zip(("theta", "pitch_frac", "ext"), x, lo, hi, tol):
+        if hi_i <= lo_i:
+            continue  # pinned, not searched
+        if xi <= lo_i + tol_i:
+            names.append(f"{name}_min")
+        elif xi >= hi_i - tol_i:
+            names.append(f"{name}_max")
+    return names
+
+
+def optimize_target(a: argparse.Namespace, base: mc.Params, evaluate, tau: float) -> tuple[Candidate | None, int]:
+    """Nelder-Mead over the unit cube mapped to (theta, pitch_frac, ext); returns the best candidate."""
+    from scipy.optimize import minimize
+
+    target = float(mc.flat_transmission_analytic(tau))
+    lo, hi = search_box(a)
+    free = hi > lo
+    cache: dict[tuple, Candidate | None] = {}
+
+    def decode(z: np.ndarray) -> tuple[float, float, float]:
+        full = lo.copy()
+        full[free] = lo[free] + np.clip(z, 0.0, 1.0) * (hi[free] - lo[free])
+        return tuple(float(v) for v in full)
+
+    def objective(z: np.ndarray) -> float:
+        x = decode(z)
+        key = tuple(round(v, 12) for v in x)
+        if key not in cache:
+            cache[key] = solve_candidate(a, base, evaluate, target, x)
+        cand = cache[key]
+        return math.inf if cand is None else cand.mass
+
+    # Start from the baseline 45-degree chevron at the no-miss pitch with no extension.
+    start = (np.array([45.0, 1.0, 0.0]) - lo)[free] / (hi - lo)[free]
+    start = np.clip(start, 0.0, 1.0)
+    minimize(
+        objective,
+        start,
+        method="Nelder-Mead",
+        bounds=[(0.0, 1.0)] * int(free.sum()),
+        options={"maxfev": a.max_evals, "xatol": BOUND_TOL, "fatol": 1e-6, "initial_simplex": _initial_simplex(start)},
+    )
+    found = [c for c in cache.values() if c is not None]
+    best = min(found, key=lambda c: c.mass) if found else None
+    return best, len(cache)
+
+
+def _initial_simplex(start: np.ndarray) -> np.ndarray:
+    # Step inward from the start point so the simplex spans the box instead of sitting on a bound.
+    simplex = [start]
+    for i in range(start.size):
+        v = start.copy()
+        v[i] = v[i] - 0.25 if v[i] > 0.5 else v[i] + 0.25
+        simplex.append(v)
+    return np.array(simplex)
+
+
+def pareto_front(rows: list[tuple[float, float, float]]) -> list[tuple[float, float, float]]:
+    """Keep (tau, T_target, mass) points not dominated by a lighter point with lower or equal transmission."""
+    front = []
+    best_mass = math.inf
+    for row in sorted(rows, key=lambda r: r[1]):
+        if row[2] < best_mass:
+            front.append(row)
+            best_mass = row[2]
+    return front
+
+
+def main() -> None:
+    a = parse_args()
+    base = base_params(a)
+
+    if a.estimator == "quadrature":
+        def evaluate(params: mc.Params, t: float) -> mc.CaseResult:
+            return mc.quadrature_case(params, params.L, t, lam=a.lam)[0]
+    else:
+        sample = mc.sample_rays(np.random.default_rng(a.seed), base)
+
+        def evaluate(params: mc.Params, t: float) -> mc.CaseResult:
+            return mc.evaluate_case(params, sample, params.L, t, lam=a.lam)
+
+    print("Chevron Mass Optimizer")
+    if a.estimator == "quadrature":
+        print("estimator=quadrature")
+    else:
+        print(f"estimator=mc samples={a.samples} seed={a.seed} sampling={a.sampling}")
+    print(f"model={a.model} L={a.L:.6g} lam={a.lam:.6g}")
+    print(
+        f"bounds: theta=[{a.theta_min:.6g}, {a.theta_max:.6g}] deg, pitch_frac=[{a.pitch_frac_min:.6g}, 1], "
+        f"ext=[0, {a.ext_max if a.model == 'surface_extended' else 0.0:.6g}]"
+    )
+
+    results = []
+    front_rows = []
+    for tau in a.taus:
+        best, evals = optimize_target(a, base, evaluate, tau)
+        target = float(mc.flat_transmission_analytic(tau))
+        mass_flat = tau / a.lam
+        if best is None:
+            print(f"tau_target={tau:.6g} T_target={target:.10g} infeasible_in_thickness_bracket evals={evals}")
+            continue
+        print(
+            f"tau_target={tau:.6g} T_target={target:.10g} theta_deg={best.theta_deg:.6g} "
+            f"pitch_frac={best.pitch_frac:.6g} pitch={best.pitch:.6g} ext={best.ext:.6g} "
+            f"t={best.t:.6g} t_stderr={best.t_stderr:.3g} M_geom={best.m_geom:.6g} mass={best.mass:.6g} "
+            f"mass_flat={mass_flat:.6g} mass_ratio={best.mass / mass_flat:.6g} "
+            f"T_chevron={best.t_chevron:.10g} evals={evals} on_bound={','.join(active_bounds(a, best)) or 'none'}"
+        )
+        results.append((tau, target, mass_flat, best, evals))
+        front_rows.append((tau, target, best.mass))
+
+    front = pareto_front(front_rows)
+    print("pareto_front (T_target, mass):")
+    for tau, target, mass in front:
+        print(f"  tau={tau:.6g} T={target:.6e} mass={mass:.6g}")
+
+    if a.out:
+        with open(a.out, "w", encoding="utf-8", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(
+                ["tau_target", "T_target", "theta_deg", "pitch_frac", "pitch", "ext", "t", "t_stderr",
+                 "M_geom", "mass", "mass_flat", "mass_ratio", "T_chevron", "T_chevron_stderr", "evals", "pareto",
+                 "on_bound"]
+            )
+            on_front = {row[0] for row in front}
+            for tau, target, mass_flat, c, evals in results:
+                w.writerow(
+                    [tau, target, c.theta_deg, c.pitch_frac, c.pitch, c.ext, c.t, c.t_stderr, c.m_geom, c.mass,
+                     mass_flat, c.mass / mass_flat, c.t_chevron, c.t_chevron_stderr, evals, tau in on_front,
+                     ",".join(active_bounds(a, c))]
+                )
+        print(f"Wrote {a.out}")
+
+
+if __name__ == "__main__":
+    main()
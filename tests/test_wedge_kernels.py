@@ -0,0 +1,63 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "wedge"))
+
+import positional_250 as wedge  # noqa: E402
+
+
+KERNEL_ACCEPTANCE = 1.0e-5
+STIFFNESS_ACCEPTANCE = 1.0e-6
+# The radial force goes like |d| d near e = 0, so central differences carry
+# an O(h / c) error there; 1e-6 m keeps it below the acceptance.
+FD_STEP = 1.0e-6
+
+EPS_VALUES = [0.01, 0.1, 0.3, 0.5, 0.7, 0.8, 0.9]
+
+# case name     alternating x offset of the shells [m]
+OFFSET_CASES = [
+    ["concentric", 0.0],
+    ["small", 0.05],
+    ["moderate", 0.5],
+    ["large", 1.5],
+]
+
+
+@pytest.fixture
+def restore_kernel():
+    yield
+    wedge.set_force_kernel("analytic")
+
+
+def gap_forces(eps):
+    c = wedge.C[0]
+    return wedge.gap_force_magnitudes_array(eps * c, c, wedge.MU, wedge.U_rel[0], wedge.L, wedge.R[0])
+
+
+@pytest.mark.parametrize("eps", EPS_VALUES)
+def test_analytic_kernel_matches_numerical(eps, restore_kernel):
+    wedge.set_force_kernel("analytic")
+    fr_analytic, ft_analytic = gap_forces(eps)
+    wedge.set_force_kernel("numerical")
+    fr_numerical, ft_numerical = gap_forces(eps)
+    scale = np.hypot(fr_numerical, ft_numerical)
+    assert abs(fr_analytic - fr_numerical) / scale < KERNEL_ACCEPTANCE
+    assert abs(ft_analytic - ft_numerical) / scale < KERNEL_ACCEPTANCE
+
+
+def test_force_table_error_bound():
+    assert wedge.force_table_error_bound() < KERNEL_ACCEPTANCE
+
+
+@pytest.mark.parametrize("offset", [c[1] for c in OFFSET_CASES], ids=[c[0] for c in OFFSET_CASES])
+def test_analytic_stiffness_matches_finite_differences(offset):
+    q0 = np.zeros((wedge.N_SHELLS, 2))
+    q0[:, 0] = offset * (-1.0) ** np.arange(wedge.N_SHELLS)
+    q0[:, 1] = 0.3 * offset
+    q0 = q0.ravel()
+    K_analytic = wedge.stiffness_matrix(q0, wedge.C, wedge.MU, wedge.U_rel, wedge.L)
+    K_numerical = wedge.build_stiffness_matrix(q0, wedge.C, wedge.MU, wedge.U_rel, wedge.L, h=FD_STEP)
+    assert np.max(np.abs(K_analytic - K_numerical)) / np.max(np.abs(K_numerical)) < STIFFNESS_ACCEPTANCE
@@ -0,0 +1,364 @@
+"""
+Ensemble runner for the multi-shell time simulation.
+
+Instead of one multi_shell_time_sim process per parameter set, every member
+of an ensemble (combinations of initial_perturb, damping, hull_offset and
+radial_fudge) is stacked into one (members, 5 * n_move) state array. The
+stack, its steady spin and the static offsets are built once. Each
+Dormand–Prince stage evaluates the forces of all members in a single
+batched FrictionBufferStack.deriv_batch call.
+
+The members share one step size: a step is accepted when every member's
+error norm is <= 1. Members are dropped from the batch when they reach a
+wall (the step size collapses on their contact) and are reported with
+status "contact"; a member whose error alone collapses the step size is
+dropped with status "step collapse".
+
+Per member the summary CSV reports:
+  * max_eccentricity: largest e/c over all gaps and samples,
+  * growth_rate: least-squares slope of log(displacement) over the second
+    half of the member's run (positive = spiralling out),
+  * settling_time: time after which the displacement stays below
+    settle_fraction of its peak (blank if it never settles).
+The displacement is the RMS distance of the moving shells from their
+static offsets.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import itertools
+import time
+from pathlib import Path
+
+import numpy as np
+
+from friction_stack import FrictionBufferStack
+from multi_shell_time_sim import (
+    DP_A,
+    DP_B,
+    DP_E,
+    DP_P,
+    MAX_FACTOR,
+    MIN_FACTOR,
+    SAFETY,
+    load_configuration,
+    next_available_path,
+)
+from positional_250 import FR_FUDGE, set_force_kernel
+from static_offset_solver import solve_static_offsets
+
+ENSEMBLE_PARAMS = ("initial_perturb", "damping", "hull_offset", "radial_fudge")
+SUMMARY_FIELDS = (
+    "member",
+    *ENSEMBLE_PARAMS,
+    "status",
+    "t_end",
+    "max_eccentricity",
+    "max_eccentricity_gap",
+    "growth_rate",
+    "settling_time",
+    "final_displacement",
+)
+
+
+class MemberContact(ValueError):
+    """A stage reached e >= c in the listed (batch-local) members."""
+
+    def __init__(self, members, message):
+        super().__init__(message)
+        self.members = members
+
+
+def ensemble_members(ens_cfg, sim_cfg, forces_cfg):
+    """
+    Parameter rows for the ensemble: each ENSEMBLE_PARAMS entry of the
+    `ensemble:` section is a value or a list; mode "grid" (default) takes
+    the Cartesian product, "zip" pairs equal-length lists. Parameters not
+    listed take the single-run value from `simulation:` / `forces:`.
+    """
+    defaults = {
+        "initial_perturb": float(sim_cfg.get("initial_perturb", 0.1)),
+        "damping": float(sim_cfg.get("damping", 3e4)),
+        "hull_offset": float(sim_cfg.get("hull_offset", 0.0)),
+        "radial_fudge": float(forces_cfg.get("radial_fudge", FR_FUDGE)),
+    }
+    lists = {}
+    for name in ENSEMBLE_PARAMS:
+        value = ens_cfg.get(name, defaults[name])
+        lists[name] = [float(v) for v in (value if isinstance(value, (list, tuple)) else [value])]
+        if not lists[name]:
+            raise ValueError(f"ensemble.{name} must not be empty.")
+
+    mode = str(ens_cfg.get("mode", "grid")).lower()
+    if mode == "grid":
+        rows = itertools.product(*(lists[name] for name in ENSEMBLE_PARAMS))
+    elif mode == "zip":
+        sizes = {len(v) for v in lists.values() if len(v) > 1}
+        if len(sizes) > 1:
+            raise ValueError("ensemble lists must have equal lengths in zip mode.")
+        n = sizes.pop() if sizes else 1
+        rows = zip(*(v * n if len(v) == 1 else v for v in lists.values()))
+    else:
+        raise ValueError('ensemble.mode must be "grid" or "zip".')
+    return [dict(zip(ENSEMBLE_PARAMS, row)) for row in rows]
+
+
+def _batch_deriv(stack, states, base, damping, fudge):
+    eps = stack.eccentricity_ratios(stack.positions(states, base))
+    touching = np.any(eps >= 1.0, axis=1)
+    if np.any(touching):
+        members = np.flatnonzero(touching)
+        raise MemberContact(members, f"{members.size} member(s) reached e >= c")
+    return stack.deriv_batch(states, base, damping, fudge)
+
+
+def integrate_ensemble(stack, states, base, damping, fudge, t_end, sample_dt, record,
+                       rtol, atol, h0, max_step=np.inf, min_step=1e-9, on_step=None):
+    """
+    Dormand–Prince 5(4) on a batch of member states (M, 5 n_move).
+
+    record(n, members, states) receives the dense-output states of the
+    still-active members at every sample time n * sample_dt (n = 0 first).
+    Returns (t_end per member, status per member, stats).
+    """
+    n_members = states.shape[0]
+    n_samples = max(1, int(np.ceil(t_end / sample_dt)))
+    member_t = np.full(n_members, float(n_samples * sample_dt))
+    status = np.array(["completed"] * n_members, dtype=object)
+    stats = {"accepted": 0, "rejected": 0, "evals": 0, "dropped": 0}
+
+    active = np.arange(n_members)
+    y = np.array(states, dtype=float)
+    record(0, active, y)
+    t = 0.0
+    t_end = n_samples * sample_dt
+    n_last = 0
+    h = min(h0, max_step, t_end)
+    f0 = None
+    wall = None
+    err_members = np.zeros(n_members)
+
+    def drop(local, reason):
+        nonlocal active, y, f0
+        keep = np.ones(active.size, dtype=bool)
+        keep[local] = False
+        member_t[active[local]] = t
+        status[active[local]] = reason
+        stats["dropped"] += int(local.size)
+        active, y = active[keep], y[keep]
+        f0 = None
+
+    while t < t_end and active.size:
+        if f0 is None:
+            try:
+                f0 = _batch_deriv(stack, y, base[active], damping[active], fudge[active])
+                stats["evals"] += 1
+            except MemberContact as exc:
+                drop(exc.members, "contact")
+                continue
+        h = min(h, max_step, t_end - t)
+        if h < min_step:
+            if wall is not None:
+                drop(wall.members, "contact")
+            else:
+                drop(np.array([int(np.argmax(err_members[:active.size]))]), "step collapse")
+            wall = None
+            h = h0
+            continue
+
+        b, d, fu = base[active], damping[active], fudge[active]
+        K = np.empty((7,) + y.shape)
+        K[0] = f0
+        try:
+            for s in range(1, 6):
+                K[s] = _batch_deriv(stack, y + h * np.tensordot(DP_A[s], K[:s], axes=1), b, d, fu)
+            new_y = y + h * np.tensordot(DP_B, K[:6], axes=1)
+            K[6] = _batch_deriv(stack, new_y, b, d, fu)
+            stats["evals"] += 6
+            wall = None
+        except MemberContact as exc:
+            stats["rejected"] += 1
+            wall = exc
+            h *= 0.5
+            continue
+
+        err = h * np.tensordot(DP_E, K, axes=1)
+        scale = atol + rtol * np.maximum(np.abs(y), np.abs(new_y))
+        err_members[:active.size] = np.sqrt(np.mean((err / scale) ** 2, axis=1))
+        err_norm = err_members[:active.size].max()
+        if err_norm > 1.0:
+            stats["rejected"] += 1
+            h *= max(MIN_FACTOR, SAFETY * err_norm ** -0.2)
+            continue
+
+        stats["accepted"] += 1
+        t_new = t + h
+        Q = np.einsum("smn,sk->mnk", K, DP_P)
+        while n_last < n_samples and (n_last + 1) * sample_dt <= t_new * (1.0 + 1e-12):
+            n_last += 1
+            t_n = min(n_last * sample_dt, t_new)
+            record(n_last, active, new_y if t_n == t_new else y + h * (Q @ (((t_n - t) / h) ** np.arange(1, 5))))
+        t, y, f0 = t_new, new_y, K[6]
+        h *= MAX_FACTOR if err_norm == 0.0 else min(MAX_FACTOR, SAFETY * err_norm ** -0.2)
+        if on_step is not None:
+            on_step(t, active.size, stats)
+
+    return member_t, status, stats
+
+
+class SampleRecorder:
+    """
+    Keeps what the summaries need from each sample: the displacement of
+    every member (RMS distance of the moving shells from their static
+    offsets) and the running max of e/c per gap. NaN marks samples after a
+    member left the batch.
+    """
+
+    def __init__(self, stack, base, n_samples):
+        self.stack = stack
+        self.base = base
+        self.base_moving = base[:, stack.moving].reshape(base.shape[0], -1)
+        self.disp = np.full((n_samples + 1, base.shape[0]), np.nan)
+        self.max_eps = np.zeros((base.shape[0], stack.n_gaps))
+        self.final = np.zeros((base.shape[0], 5 * stack.n_move))
+
+    def __call__(self, n, members, states):
+        n_move = self.stack.n_move
+        eps = self.stack.eccentricity_ratios(self.stack.positions(states, self.base[members]))
+        np.maximum(self.max_eps[members], eps, out=eps)
+        self.max_eps[members] = eps
+        offset = states[:, :2*n_move] - self.base_moving[members]
+        self.disp[n, members] = np.sqrt(np.mean(offset ** 2, axis=1))
+        self.final[members] = states
+
+    def summaries(self, sample_dt, settle_fraction):
+        """
+        Per-member (max e/c, its gap, growth rate, settling time, final
+        displacement).
+        """
+        times = sample_dt * np.arange(self.disp.shape[0])
+        rows = []
+        for m in range(self.disp.shape[1]):
+            ok = ~np.isnan(self.disp[:, m])
+            disp, t = self.disp[ok, m], times[ok]
+
+            growth = np.nan
+            late = (t >= 0.5 * t[-1]) & (disp > 0.0)
+            if np.count_nonzero(late) >= 2:
+                growth = float(np.polyfit(t[late], np.log(disp[late]), 1)[0])
+
+            settling = np.nan
+            above = np.flatnonzero(disp > settle_fraction * disp.max())
+            if disp.max() == 0.0:
+                settling = 0.0
+            elif above[-1] < disp.size - 1:
+                settling = float(t[above[-1] + 1])
+
+            gap = int(np.argmax(self.max_eps[m]))
+            rows.append((float(self.max_eps[m, gap]), gap, growth, settling, float(disp[-1])))
+        return rows
+
+
+def _fmt(value):
+    return "" if isinstance(value, float) and np.isnan(value) else value
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run many multi_shell_time_sim members in one batched integration."
+    )
+    parser.add_argument("run_dir", help="Run directory; inputs.yaml holds `ensemble:` next to the usual sections.")
+    args = parser.parse_args()
+
+    run_dir = Path(args.run_dir).expanduser().resolve()
+    if not run_dir.is_dir():
+        raise FileNotFoundError(f"Run directory {run_dir} does not exist.")
+    config = load_configuration(run_dir)
+    sim_cfg = config.get("simulation", {})
+    forces_cfg = config.get("forces", {})
+    ens_cfg = config.get("ensemble", {})
+
+    dt = float(sim_cfg.get("dt", 0.05))
+    total_time = float(sim_cfg.get("total_time", 1000.0))
+    outer_offset = float(sim_cfg.get("outer_offset", 0.0))
+    rtol = float(sim_cfg.get("rtol", 1e-6))
+    max_step = float(sim_cfg.get("max_step", np.inf))
+    sample_dt = float(ens_cfg.get("sample_dt", dt))
+    settle_fraction = float(ens_cfg.get("settle_fraction", 0.05))
+    if str(sim_cfg.get("integrator", "dopri5")).lower() != "dopri5":
+        print("[ensemble] members are integrated with batched dopri5; simulation.integrator is ignored")
+    if dt <= 0.0 or sample_dt <= 0.0 or total_time <= 0.0:
+        raise ValueError("simulation.dt, ensemble.sample_dt and simulation.total_time must be positive.")
+    set_force_kernel(str(forces_cfg.get("kernel", "analytic")))
+
+    members = ensemble_members(ens_cfg, sim_cfg, forces_cfg)
+    stack = FrictionBufferStack.from_config(config.get("stack", {}))
+    n_move = stack.n_move
+    print(f"[ensemble] {len(members)} members on a {stack.n_shells}-shell stack")
+
+    # Static offsets once per distinct hull offset.
+    offsets = {}
+    for hull_offset in sorted({m["hull_offset"] for m in members}):
+        if abs(hull_offset) > 0.0 or abs(outer_offset) > 0.0:
+            offsets[hull_offset] = solve_static_offsets(hull_offset, outer_offset, stack=stack).offsets
+        else:
+            offsets[hull_offset] = np.zeros(stack.n_shells)
+    base = np.zeros((len(members), stack.n_shells, 2))
+    for k, m in enumerate(members):
+        base[k, :, 0] = offsets[m["hull_offset"]]
+
+    states = np.stack([stack.initial_state(base[k], m["initial_perturb"]) for k, m in enumerate(members)])
+    damping = np.array([m["damping"] for m in members])
+    fudge = np.array([m["radial_fudge"] for m in members])
+    atol = np.concatenate([
+        np.full(2 * n_move, float(sim_cfg.get("atol_position", 1e-6))),
+        np.full(2 * n_move, float(sim_cfg.get("atol_velocity", 1e-9))),
+        np.full(n_move, float(sim_cfg.get("atol_omega", 1e-12))),
+    ])
+
+    print_interval = float(sim_cfg.get("print_interval", 2.0))
+    next_print = time.perf_counter() + print_interval if print_interval > 0.0 else None
+
+    def on_step(t, n_active, stats):
+        nonlocal next_print
+        if next_print is None or time.perf_counter() < next_print:
+            return
+        print(f"[progress] sim t = {t:9.1f}s / {total_time:9.1f}s  |  {n_active} active members")
+        next_print = time.perf_counter() + print_interval
+
+    recorder = SampleRecorder(stack, base, max(1, int(np.ceil(total_time / sample_dt))))
+    wall_start = time.perf_counter()
+    member_t, status, stats = integrate_ensemble(
+        stack, states, base, damping, fudge, total_time, sample_dt, recorder,
+        rtol, atol, h0=dt, max_step=max_step, on_step=on_step,
+    )
+    wall = time.perf_counter() - wall_start
+    print(
+        f"[integrator] batched dopri5: {stats['accepted']} accepted / {stats['rejected']} rejected steps, "
+        f"{stats['evals']} batched force evaluations, {stats['dropped']} members dropped, "
+        f"{wall:.2f} s ({wall / len(members):.3f} s per member)"
+    )
+
+    rows = []
+    summaries = recorder.summaries(sample_dt, settle_fraction)
+    for k, (m, summary) in enumerate(zip(members, summaries)):
+        rows.append((k, *(m[name] for name in ENSEMBLE_PARAMS), status[k], member_t[k], *summary))
+
+    print(f"\n{'member':>6s} {'perturb':>8s} {'damping':>9s} {'hull_off':>8s} {'fudge':>6s} "
+          f"{'status':>9s} {'max e/c':>8s} {'growth':>11s} {'settle':>8s}")
+    for row in rows:
+        k, perturb, damp, hull, fud, st, _, max_eps, _, growth, settle, _ = row
+        print(f"{k:6d} {perturb:8.3g} {damp:9.3g} {hull:8.3g} {fud:6.3g} {st:>9s} "
+              f"{max_eps:8.4f} {growth: .4e} {settle:8.1f}")
+
+    out_path = next_available_path(run_dir, str(ens_cfg.get("summary", "ensemble_summary.csv")))
+    with out_path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(SUMMARY_FIELDS)
+        writer.writerows([_fmt(v) for v in row] for row in rows)
+    print(f"[output] saved {out_path}")
+
+
+if __name__ == "__main__":
+    main()
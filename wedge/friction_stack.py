@@ -0,0 +1,473 @@
+"""
+Configurable friction-buffer stack for the laminar wedge model.
+
+positional_250 fixes the 17-shell reference stack (R_HULL, GAP, L, ...) as
+module globals, and multi_shell_time_sim used to derive its mass model from
+them at import time. FrictionBufferStack carries the same quantities per
+instance: radii, per-gap clearances, per-shell masses and inertias, the
+steady spin and the baseline slip. It is built from a configuration mapping,
+so stacks of hundreds of shells with non-uniform clearances can be simulated
+side by side.
+
+Every per-gap quantity is an array over gaps, forces go through the
+array-wide total_fluid_forces, and K / D are assembled block-tridiagonally
+(sparse CSR by default), so forces, equations of motion and Jacobians all
+cost O(N).
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from positional_250 import (
+    GAP,
+    L,
+    MU,
+    N_SHELLS,
+    R_HULL,
+    V_HULL,
+    ForceWorkspace,
+    damping_matrix,
+    gap_force_magnitudes_array,
+    stiffness_matrix,
+    total_fluid_forces,
+)
+from steady_spin import series_steady_omegas, signed_torques_on_inner, torque_coefficients
+
+RHO_AIR = 1.2  # kg/m^3
+CONFIG_KEYS = (
+    "n_shells",
+    "r_hull",
+    "gap",
+    "clearances",
+    "length",
+    "mu",
+    "v_hull",
+    "omega_outer",
+    "rho_air",
+    "masses",
+    "inertias",
+)
+
+
+@dataclass
+class FrictionBufferStack:
+    """
+    Shells 0..N-1: the hull (0) and the outer envelope (N-1) are fixed, the
+    buffers 1..N-2 move. Spin is driven by the hull at omega_inner against
+    the envelope at omega_outer.
+    """
+
+    radii: np.ndarray  # (N,) inner radius of each shell [m]
+    clearances: np.ndarray  # (N-1,) radial gap widths [m]
+    masses: np.ndarray  # (N-2,) moving shells 1..N-2 [kg]
+    inertias: np.ndarray  # (N-2,) moving shells 1..N-2 [kg m^2]
+    length: float = L
+    mu: float = MU
+    omega_inner: float = V_HULL / R_HULL
+    omega_outer: float = 0.0
+
+    torque_coeffs: np.ndarray = field(init=False, repr=False)
+    omega_steady: np.ndarray = field(init=False, repr=False)
+    u_rel: np.ndarray = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.radii = np.asarray(self.radii, dtype=float)
+        self.clearances = np.asarray(self.clearances, dtype=float)
+        n = self.radii.size
+        if n < 3:
+            raise ValueError("A stack needs at least 3 shells (hull, one buffer, envelope).")
+        self.masses = np.broadcast_to(np.asarray(self.masses, dtype=float), (n - 2,)).copy()
+        self.inertias = np.broadcast_to(np.asarray(self.inertias, dtype=float), (n - 2,)).copy()
+        if self.clearances.shape != (n - 1,):
+            raise ValueError(f"Expected {n - 1} clearances for {n} shells, got {self.clearances.size}.")
+        if np.any(self.masses <= 0.0):
+            raise ValueError("Shell masses must be positive.")
+        if np.any(self.inertias < 0.0):
+            raise ValueError("Shell inertias must be non-negative.")
+
+        self.torque_coeffs = torque_coefficients(self.mu, self.length, self.radii, self.clearances)
+        self.omega_steady = series_steady_omegas(self.torque_coeffs, self.omega_inner, self.omega_outer)
+        self.u_rel = self.slip(self.omega_steady)
+
+        # Index arrays and work buffers for deriv (reused across RK stages,
+        # so a call with `out` allocates nothing with the analytic kernel).
+        self.moving = np.arange(1, n - 1)
+        self.moving_dofs = (2 * self.moving[:, None] + np.arange(2)).ravel()
+        self._inv_mass = 1.0 / np.repeat(self.masses, 2)
+        self._inv_inertia = np.divide(
+            1.0, self.inertias, out=np.zeros(n - 2), where=self.inertias > 0.0
+        )
+        self._q = np.zeros(2 * n)
+        self._omega = self.omega_steady.copy()
+        self._rim_speed = np.zeros(n)
+        self._u = np.zeros(n - 1)
+        self._d = np.zeros((n - 1, 2))
+        self._tau = np.zeros(n - 1)
+        self._dw = np.zeros(n - 1)
+        self._torque = np.zeros(n)
+        self._forces = ForceWorkspace(n)
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def build(cls, n_shells=N_SHELLS, r_hull=R_HULL, gap=GAP, clearances=None,
+              length=L, mu=MU, v_hull=V_HULL, omega_outer=0.0, rho_air=RHO_AIR,
+              masses=None, inertias=None):
+        """
+        Stack around a hull of radius r_hull. Shell i+1 sits one clearance
+        outside shell i; clearances defaults to n_shells - 1 gaps of `gap`
+        (its length sets the shell count when given).
+
+        masses defaults to the air mass of each moving shell's inner annulus
+        and inertias to the thin-ring m R^2; either may be a scalar or one
+        value per moving shell.
+        """
+        if clearances is None:
+            clearances = np.full(int(n_shells) - 1, float(gap))
+        clearances = np.asarray(clearances, dtype=float)
+        if clearances.ndim != 1 or clearances.size < 2:
+            raise ValueError("Need at least two gaps (three shells).")
+        if np.any(clearances <= 0.0):
+            raise ValueError("All clearances must be positive.")
+        radii = r_hull + np.concatenate(([0.0], np.cumsum(clearances)))
+
+        if masses is None:
+            masses = rho_air * np.pi * (radii[1:-1] ** 2 - radii[:-2] ** 2) * length
+        masses = np.broadcast_to(np.asarray(masses, dtype=float), (radii.size - 2,))
+        if inertias is None:
+            inertias = masses * radii[1:-1] ** 2
+
+        return cls(
+            radii=radii,
+            clearances=clearances,
+            masses=masses,
+            inertias=inertias,
+            length=float(length),
+            mu=float(mu),
+            omega_inner=float(v_hull) / float(r_hull),
+            omega_outer=float(omega_outer),
+        )
+
+    @classmethod
+    def from_config(cls, config=None):
+        """
+        Build from a mapping such as the `stack:` section of a run's YAML,
+        with keys from CONFIG_KEYS; missing keys take the reference values.
+        """
+        config = dict(config or {})
+        unknown = sorted(set(config) - set(CONFIG_KEYS))
+        if unknown:
+            raise ValueError(f"Unknown stack keys {unknown}; expected a subset of {CONFIG_KEYS}.")
+        return cls.build(**config)
+
+    # ------------------------------------------------------------------
+    # Sizes and kinematics
+    # ------------------------------------------------------------------
+
+    @property
+    def n_shells(self):
+        return self.radii.size
+
+    @property
+    def n_gaps(self):
+        return self.radii.size - 1
+
+    @property
+    def n_move(self):
+        return self.radii.size - 2
+
+    def slip(self, omegas):
+        """
+        |ω_i R_i - ω_{i+1} R_{i+1}| per gap; omegas may carry leading batch axes.
+        """
+        speed = np.asarray(omegas, dtype=float) * self.radii
+        return np.abs(speed[..., :-1] - speed[..., 1:])
+
+    def positions(self, states, base_positions):
+        """
+        Global q (..., 2N) from states (..., 5 n_move) and fixed-shell
+        centres base_positions (..., N, 2).
+        """
+        states = np.asarray(states, dtype=float)
+        lead = states.shape[:-1]
+        q = np.broadcast_to(base_positions, lead + (self.n_shells, 2)).reshape(lead + (-1,)).copy()
+        q[..., self.moving_dofs] = states[..., :2*self.n_move]
+        return q
+
+    def eccentricity_ratios(self, q):
+        """
+        e_i / c_i per gap for q of shape (..., 2N).
+        """
+        pos = np.asarray(q, dtype=float).reshape(np.shape(q)[:-1] + (-1, 2))
+        d = pos[..., :-1, :] - pos[..., 1:, :]
+        return np.hypot(d[..., 0], d[..., 1]) / self.clearances
+
+    # ------------------------------------------------------------------
+    # Forces, torques and Jacobians
+    # ------------------------------------------------------------------
+
+    def fluid_forces(self, q, u_rel=None):
+        """
+        Wedge force on every shell, same shape as q ((2N,) or (batch, 2N));
+        u_rel defaults to the steady slip.
+        """
+        u = self.u_rel if u_rel is None else u_rel
+        return total_fluid_forces(q, self.clearances, self.mu, u, self.length, radii=self.radii)
+
+    def fluid_torques(self, q, omegas):
+        """
+        Fluid torque on every shell: each gap acts on its inner shell and
+        reacts on its outer one.
+        """
+        pos = np.asarray(q, dtype=float).reshape(-1, 2)
+        d = pos[:-1] - pos[1:]
+        tau = signed_torques_on_inner(
+            omegas[:-1], omegas[1:], self.torque_coeffs, np.hypot(d[:, 0], d[:, 1]), self.clearances
+        )
+        T = np.zeros(self.n_shells)
+        T[:-1] += tau
+        T[1:] -= tau
+        return T
+
+    def stiffness_matrix(self, q0, u_rel=None, sparse=True):
+        """
+        Analytic K = -dF/dq at q0, block-tridiagonal (CSR unless sparse=False).
+        """
+        u = self.u_rel if u_rel is None else u_rel
+        return stiffness_matrix(q0, self.clearances, self.mu, u, self.length, sparse=sparse, radii=self.radii)
+
+    def damping_matrix(self, q0, sparse=True):
+        """
+        Analytic squeeze-film damping D = -dF/dq̇ at q0.
+        """
+        return damping_matrix(q0, self.clearances, self.mu, self.u_rel, self.length, sparse=sparse, radii=self.radii)
+
+    # ------------------------------------------------------------------
+    # Equations of motion: state = [positions(2*n_move), velocities(2*n_move), omegas(n_move)]
+    # ------------------------------------------------------------------
+
+    def initial_state(self, base_positions, perturb=0.0):
+        """
+        Moving shells at base_positions (N, 2), at rest and at steady spin,
+        with shell 1 displaced by `perturb` in x.
+        """
+        pos0 = np.asarray(base_positions, dtype=float)[self.moving].copy()
+        pos0[0, 0] += perturb
+        return np.concatenate([pos0.ravel(), np.zeros(2 * self.n_move), self.omega_steady[self.moving]])
+
+    def deriv(self, state, base_positions, damping, out=None):
+        """
+        Time derivative of the state:
+
+            m a = F_fluid(q, ω) - damping v,   I α = T_fluid(q, ω)
+
+        with the fixed shells held at base_positions (N, 2). Written into
+        `out` when given; otherwise a new array is returned. With `out` and
+        the analytic kernel the call allocates no temporaries: the forces
+        go through the stack's ForceWorkspace and everything else through
+        its own buffers.
+        """
+        n_move = self.n_move
+        if out is None:
+            out = np.empty_like(state)
+        vel = state[2*n_move:4*n_move]
+
+        # Global positions + angular speeds for all shells (the moving
+        # shells are the contiguous block 1..N-2).
+        q = self._q
+        q[:] = base_positions.reshape(-1)
+        q[2:-2] = state[:2*n_move]
+        omega = self._omega
+        omega[1:-1] = state[4*n_move:]
+
+        # Relative tangential slip from current angular speeds
+        np.multiply(omega, self.radii, out=self._rim_speed)
+        np.subtract(self._rim_speed[:-1], self._rim_speed[1:], out=self._u)
+        np.abs(self._u, out=self._u)
+
+        F = total_fluid_forces(
+            q, self.clearances, self.mu, self._u, self.length, radii=self.radii, work=self._forces
+        )
+
+        # Fluid torques on the inner shell of each gap (reacting on its outer
+        # one), evaluated in place as in signed_torques_on_inner:
+        # tau = coeff (ω_{i+1} - ω_i) / sqrt(1 - eps^2). total_fluid_forces
+        # has already rejected eps >= 1.
+        pos = q.reshape(-1, 2)
+        np.subtract(pos[:-1], pos[1:], out=self._d)
+        tau = self._tau
+        np.hypot(self._d[:, 0], self._d[:, 1], out=tau)
+        tau /= self.clearances
+        np.multiply(tau, tau, out=tau)
+        np.subtract(1.0, tau, out=tau)
+        np.sqrt(tau, out=tau)
+        np.divide(self.torque_coeffs, tau, out=tau)
+        np.subtract(omega[1:], omega[:-1], out=self._dw)
+        tau *= self._dw
+        T = self._torque
+        T[:] = 0.0
+        T[:-1] += tau
+        T[1:] -= tau
+
+        # dpos = vel, dvel = (F - damping v) / m, domega = T / I
+        out[:2*n_move] = vel
+        dvel = out[2*n_move:4*n_move]
+        np.multiply(vel, -damping, out=dvel)
+        dvel += F[2:-2]
+        dvel *= self._inv_mass
+        np.multiply(T[1:-1], self._inv_inertia, out=out[4*n_move:])
+        return out
+
+    def state_jacobian(self, state, base_positions, damping):
+        """
+        Analytic d(deriv)/d(state) at `state`, as a CSR matrix in the same
+        [positions, velocities, omegas] ordering (for the implicit
+        integrators). Position terms are the analytic K at the current slip;
+        the spin enters through F ∝ U_i = |ω_i R_i - ω_{i+1} R_{i+1}| and the
+        torque factor 1/sqrt(1 - eps^2). Quasi-steady forces, so no film
+        damping D (see stability_250.state_matrix for the linearization with
+        it).
+        """
+        from scipy.sparse import bmat, coo_matrix, diags, identity
+
+        n = self.n_shells
+        n_move = self.n_move
+        gaps = np.arange(n - 1)
+        q = self.positions(state, base_positions)
+        omega = self.omega_steady.copy()
+        omega[self.moving] = state[4*n_move:]
+        speed = omega * self.radii
+        slip = speed[:-1] - speed[1:]
+
+        K = self.stiffness_matrix(q, u_rel=np.abs(slip))
+
+        # Gap geometry; concentric gaps have no force and df/de = 0.
+        pos = q.reshape(n, 2)
+        d = pos[:-1] - pos[1:]
+        e = np.hypot(d[:, 0], d[:, 1])
+        er = d / np.where(e > 0.0, e, 1.0)[:, None]
+        et = np.stack([-er[:, 1], er[:, 0]], axis=1)
+
+        # dF_gap/dω from F ∝ U: the force per unit slip times dU/dω.
+        Fr, Ft = gap_force_magnitudes_array(e, self.clearances, self.mu, 1.0, self.length, self.radii[:-1])
+        F_per_U = Fr[:, None] * er + Ft[:, None] * et
+        sgn = np.sign(slip)
+        dF_dw_in = F_per_U * (sgn * self.radii[:-1])[:, None]
+        dF_dw_out = -F_per_U * (sgn * self.radii[1:])[:, None]
+
+        # Torque on the inner shell: tau = -coeff (ω_i - ω_{i+1}) f(e).
+        eps = e / self.clearances
+        f = 1.0 / np.sqrt(1.0 - eps**2)
+        df_de = eps / (self.clearances * (1.0 - eps**2) ** 1.5)
+        dtau_dw = self.torque_coeffs * f
+        dtau_dd = (-self.torque_coeffs * (omega[:-1] - omega[1:]) * df_de)[:, None] * er
+
+        # Each gap acts on its inner shell (+) and reacts on its outer one (-).
+        axes = np.arange(2)
+        rows_in = (2 * gaps[:, None] + axes).ravel()
+        rows_out = rows_in + 2
+        cols = np.repeat(gaps, 2)
+        dF_dw = coo_matrix(
+            (
+                np.concatenate([dF_dw_in.ravel(), dF_dw_out.ravel(), -dF_dw_in.ravel(), -dF_dw_out.ravel()]),
+                (np.concatenate([rows_in, rows_in, rows_out, rows_out]), np.concatenate([cols, cols + 1, cols, cols + 1])),
+            ),
+            shape=(2 * n, n),
+        ).tocsr()
+        dT_dq = coo_matrix(
+            (
+                np.concatenate([dtau_dd.ravel(), -dtau_dd.ravel(), -dtau_dd.ravel(), dtau_dd.ravel()]),
+                (np.concatenate([cols, cols, cols + 1, cols + 1]), np.concatenate([rows_in, rows_out, rows_in, rows_out])),
+            ),
+            shape=(n, 2 * n),
+        ).tocsr()
+        dT_dw = coo_matrix(
+            (
+                np.concatenate([-dtau_dw, dtau_dw, dtau_dw, -dtau_dw]),
+                (np.concatenate([gaps, gaps, gaps + 1, gaps + 1]), np.concatenate([gaps, gaps + 1, gaps, gaps + 1])),
+            ),
+            shape=(n, n),
+        ).tocsr()
+
+        # Restrict to the moving shells and scale by 1/m, 1/I.
+        dofs = self.moving_dofs
+        inv_m = diags(self._inv_mass)
+        inv_I = diags(self._inv_inertia)
+        return bmat(
+            [
+                [None, identity(2 * n_move), None],
+                [-inv_m @ K[dofs][:, dofs], diags(-damping * self._inv_mass), inv_m @ dF_dw[dofs][:, self.moving]],
+                [inv_I @ dT_dq[self.moving][:, dofs], None, inv_I @ dT_dw[self.moving][:, self.moving]],
+            ],
+            format="csr",
+        )
+
+    def deriv_batch(self, states, base_positions, damping, fr_fudge=None):
+        """
+        deriv for a batch of states (B, 5 n_move) evaluated in one array pass.
+        base_positions (B, N, 2) or (N, 2), damping and fr_fudge (B,) or
+        scalars; fr_fudge=None uses positional_250.FR_FUDGE. Work buffers are
+        not reused, so the result is always a new array.
+        """
+        n_move = self.n_move
+        states = np.asarray(states, dtype=float)
+        batch = states.shape[0]
+        vel = states[:, 2*n_move:4*n_move]
+
+        q = self.positions(states, base_positions)
+        omega = np.broadcast_to(self.omega_steady, (batch, self.n_shells)).copy()
+        omega[:, self.moving] = states[:, 4*n_move:]
+        fudge = None if fr_fudge is None else np.broadcast_to(np.asarray(fr_fudge, dtype=float), (batch,))[:, None]
+        F = total_fluid_forces(
+            q, self.clearances, self.mu, self.slip(omega), self.length, radii=self.radii, fr_fudge=fudge
+        )
+
+        pos = q.reshape(batch, -1, 2)
+        d = pos[:, :-1] - pos[:, 1:]
+        tau = signed_torques_on_inner(
+            omega[:, :-1], omega[:, 1:], self.torque_coeffs, np.hypot(d[..., 0], d[..., 1]), self.clearances
+        )
+        T = np.zeros((batch, self.n_shells))
+        T[:, :-1] += tau
+        T[:, 1:] -= tau
+
+        out = np.empty_like(states)
+        out[:, :2*n_move] = vel
+        dvel = out[:, 2*n_move:4*n_move]
+        np.multiply(vel, -np.broadcast_to(np.asarray(damping, dtype=float), (batch,))[:, None], out=dvel)
+        dvel += F[:, self.moving_dofs]
+        dvel *= self._inv_mass
+        np.multiply(T[:, self.moving], self._inv_inertia, out=out[:, 4*n_move:])
+        return out
+
+
+if __name__ == "__main__":
+    import time
+
+    ref = FrictionBufferStack.build()
+    print(f"reference: {ref.n_shells} shells, slip per gap {ref.u_rel[0]:.4f} .. {ref.u_rel[-1]:.4f} m/s")
+
+    for n in (17, 101, 401):
+        clearances = np.linspace(6.0, 3.0, n - 1)
+        stack = FrictionBufferStack.build(clearances=clearances)
+        rng = np.random.default_rng(0)
+        q = np.zeros((n, 2))
+        q[:, :] = 0.1 * rng.standard_normal((n, 2))
+        q = q.ravel()
+        state = stack.initial_state(q.reshape(n, 2), perturb=0.1)
+        t0 = time.perf_counter()
+        for _ in range(100):
+            stack.deriv(state, q.reshape(n, 2), 3e4)
+        t_deriv = (time.perf_counter() - t0) / 100
+        t0 = time.perf_counter()
+        K = stack.stiffness_matrix(q)
+        D = stack.damping_matrix(q)
+        t_jac = time.perf_counter() - t0
+        print(
+            f"N = {n:4d}: deriv {1e6 * t_deriv:7.1f} µs, K + D {1e3 * t_jac:6.2f} ms "
+            f"({K.nnz + D.nnz} non-zeros)"
+        )
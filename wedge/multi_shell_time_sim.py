@@ -1,4 +1,4 @@
-import sys
+import argparse
 import time
 from pathlib import Path
 
@@ -8,53 +8,26 @@ import yaml
 
 # Import your laminar wedge model & geometry
 from positional_250 import (
-    N_SHELLS,
-    R,          # radii of shells (inner radius of each shell)
-    C,          # clearances per gap (len = N_SHELLS-1)
-    MU,
-    L,          # axial length
-    TORQUE_COEFFS,
-    SHELL_OMEGA_STEADY,
-    total_fluid_forces,
     set_radial_fudge_factor,
+    set_force_kernel,
 )
+from friction_stack import FrictionBufferStack
+from sim_io import TrajectoryWriter, load_checkpoint, save_checkpoint, trajectory_columns
 from static_offset_solver import solve_static_offsets
-from steady_spin import signed_torque_on_inner
 
 # ----------------------------------------------------
-# Mass model: each friction-buffer shell gets a mass
-# ≈ 1/4 of the air mass in its inner annulus
+# Stack geometry and mass model come from the `stack:` config section
+# (friction_stack.FrictionBufferStack); main() installs them here before
+# integrating. By default each moving shell gets the air mass of its
+# inner annulus and a thin-ring inertia I = m R^2.
 # ----------------------------------------------------
 
-rho_air = 1.2  # kg/m^3
-
-# Air mass in each annulus (gap between shell i and i+1)
-gap_masses = np.zeros(N_SHELLS - 1)
-for i in range(N_SHELLS - 1):
-    R_inner = R[i]
-    R_outer = R[i+1]
-    volume = np.pi * (R_outer**2 - R_inner**2) * L   # exact annulus volume
-    gap_masses[i] = rho_air * volume
-
-# Moving shells: 1..N_SHELLS-2 (hull 0 fixed, outer stator N_SHELLS-1 fixed)
-moving_indices = list(range(1, N_SHELLS - 1))
-n_move = len(moving_indices)
-
-# Assign each moving shell a mass = 1/4 of the air mass in its *inner* annulus
-shell_masses = np.zeros(n_move)
-for j, s in enumerate(moving_indices):
-    shell_masses[j] = gap_masses[s - 1]
+STACK = None
+BASE_POSITIONS = None  # (n_shells, 2) centres of the fixed shells
 
 # Small isotropic damping for each shell (to keep things from ringing forever)
 C_DAMP = 3e4  # N·s/m; set >0 if you want some damping
 
-# Rotational inertia per moving shell (approximate thin ring: I = m * R^2)
-shell_inertias = np.zeros(n_move)
-for j, s in enumerate(moving_indices):
-    shell_inertias[j] = shell_masses[j] * (R[s] ** 2)
-
-BASE_POSITIONS = np.zeros((N_SHELLS, 2))
-
 DEFAULTS_DIR = Path(__file__).resolve().parent / "defaults"
 DEFAULT_CONFIG = DEFAULTS_DIR / "multi_shell_time_sim.yaml"
 RUN_INPUT_NAMES = ("inputs.yaml", "inputs.yml")
@@ -126,77 +99,49 @@ def next_available_path(directory, desired_name):
 # Dynamics: state = [positions(2*n_move), velocities(2*n_move), omegas(n_move)]
 # ----------------------------------------------------
 
-def deriv(state):
+def deriv(state, out=None):
     """
-    Compute time derivative of the state for all moving shells.
+    Compute time derivative of the state for all moving shells of STACK.
 
     state shape: (5 * n_move,)
       - first 2*n_move entries: [x_1, y_1, x_2, y_2, ..., x_{N-2}, y_{N-2}]
       - next  2*n_move entries: [vx_1, vy_1, vx_2, vy_2, ..., vx_{N-2}, vy_{N-2}]
       - final n_move entries: angular velocities ω_s for moving shells
-    """
-    pos = state[:2*n_move].reshape((n_move, 2))
-    vel = state[2*n_move:4*n_move].reshape((n_move, 2))
-    omega = state[4*n_move:]
-
-    # Build global positions + angular speeds for all shells
-    q_global = BASE_POSITIONS.reshape(-1).copy()
-    omega_global = np.array(SHELL_OMEGA_STEADY, copy=True)
-    for j, s in enumerate(moving_indices):
-        q_global[2*s:2*s+2] = pos[j]
-        omega_global[s] = omega[j]
-
-    # Relative tangential slip from current angular speeds
-    u_rel = np.abs(omega_global[:-1] * R[:-1] - omega_global[1:] * R[1:])
-
-    # Fluid wedge forces on all shells
-    F_global = total_fluid_forces(q_global, C, MU, u_rel, L)
-
-    # Fluid torques on each shell (array length N_SHELLS)
-    T_global = np.zeros(N_SHELLS)
-    for i in range(N_SHELLS - 1):
-        r_inner = q_global[2*i:2*i+2]
-        r_outer = q_global[2*(i+1):2*(i+1)+2]
-        e = np.linalg.norm(r_inner - r_outer)
-        torque_inner = signed_torque_on_inner(
-            omega_global[i],
-            omega_global[i+1],
-            TORQUE_COEFFS[i],
-            e,
-            C[i],
-        )
-        T_global[i] += torque_inner
-        T_global[i+1] -= torque_inner
-
-    # Accelerations for moving shells
-    acc = np.zeros_like(pos)
-    for j, s in enumerate(moving_indices):
-        Fx, Fy = F_global[2*s:2*s+2]
-        m = shell_masses[j]
-        acc[j, 0] = (Fx - C_DAMP * vel[j, 0]) / m
-        acc[j, 1] = (Fy - C_DAMP * vel[j, 1]) / m
 
-    # Angular accelerations
-    alpha = np.zeros_like(omega)
-    for j, s in enumerate(moving_indices):
-        torque = T_global[s]
-        I = shell_inertias[j]
-        if I > 0.0:
-            alpha[j] = torque / I
+    Written into `out` when given (callers keep one buffer per RK stage);
+    otherwise a new array is returned.
+    """
+    return STACK.deriv(state, BASE_POSITIONS, C_DAMP, out=out)
 
-    dpos = vel
-    dvel = acc
-    domega = alpha
 
-    return np.concatenate([dpos.reshape(-1), dvel.reshape(-1), domega])
+_RK4_WORK = {}  # state size -> (stage derivatives k, stage state)
 
 
 def rk4_step(state, dt):
-    k1 = deriv(state)
-    k2 = deriv(state + 0.5 * dt * k1)
-    k3 = deriv(state + 0.5 * dt * k2)
-    k4 = deriv(state + dt * k3)
-    return state + (dt / 6.0) * (k1 + 2*k2 + 2*k3 + k4)
+    """
+    Classical RK4 step. Stage buffers are kept per state size, so the only
+    allocation is the returned state.
+    """
+    if state.size not in _RK4_WORK:
+        _RK4_WORK[state.size] = (np.empty((4, state.size)), np.empty(state.size))
+    k, tmp = _RK4_WORK[state.size]
+    k1, k2, k3, k4 = k
+    deriv(state, out=k1)
+    np.multiply(k1, 0.5 * dt, out=tmp)
+    np.add(tmp, state, out=tmp)
+    deriv(tmp, out=k2)
+    np.multiply(k2, 0.5 * dt, out=tmp)
+    np.add(tmp, state, out=tmp)
+    deriv(tmp, out=k3)
+    np.multiply(k3, dt, out=tmp)
+    np.add(tmp, state, out=tmp)
+    deriv(tmp, out=k4)
+    k2 += k3
+    k2 *= 2.0
+    k1 += k2
+    k1 += k4
+    k1 *= dt / 6.0
+    return state + k1
 
 
 def rk4_step_adaptive(state, dt, depth, _initial=True):
@@ -216,18 +161,203 @@ def rk4_step_adaptive(state, dt, depth, _initial=True):
         return rk4_step_adaptive(mid, 0.5 * dt, depth - 1, _initial=False)
 
 
+# ----------------------------------------------------
+# Adaptive integrators
+# ----------------------------------------------------
+
+INTEGRATORS = ("rk4", "dopri5", "radau", "bdf")
+
+# Dormand–Prince 5(4) tableau with its 4th-order continuous extension
+# (same coefficients as scipy's RK45).
+DP_C = np.array([0.0, 1/5, 3/10, 4/5, 8/9, 1.0])
+DP_A = [
+    np.array([]),
+    np.array([1/5]),
+    np.array([3/40, 9/40]),
+    np.array([44/45, -56/15, 32/9]),
+    np.array([19372/6561, -25360/2187, 64448/6561, -212/729]),
+    np.array([9017/3168, -355/33, 46732/5247, 49/176, -5103/18656]),
+]
+DP_B = np.array([35/384, 0.0, 500/1113, 125/192, -2187/6784, 11/84])
+DP_E = np.array([-71/57600, 0.0, 71/16695, -71/1920, 17253/339200, -22/525, 1/40])
+DP_P = np.array([
+    [1.0, -8048581381/2820520608, 8663915743/2820520608, -12715105075/11282082432],
+    [0.0, 0.0, 0.0, 0.0],
+    [0.0, 131558114200/32700410799, -68118460800/10900136933, 87487479700/32700410799],
+    [0.0, -1754552775/470086768, 14199869525/1410260304, -10690763975/1880347072],
+    [0.0, 127303824393/49829197408, -318862633887/49829197408, 701980252875/199316789632],
+    [0.0, -282668133/205662961, 2019193451/616988883, -1453857185/822651844],
+    [0.0, 40617522/29380423, -110615467/29380423, 69997945/29380423],
+])
+SAFETY = 0.9
+MIN_FACTOR = 0.2
+MAX_FACTOR = 10.0
+
+
+def _dopri5_step(state, f0, h):
+    """
+    One Dormand–Prince step from (state, f0 = deriv(state)).
+
+    Returns (new_state, stages K of shape (7, n), error estimate).
+    """
+    K = np.empty((7, state.size))
+    K[0] = f0
+    for s in range(1, 6):
+        deriv(state + h * (DP_A[s] @ K[:s]), out=K[s])
+    new_state = state + h * (DP_B @ K[:6])
+    deriv(new_state, out=K[6])
+    return new_state, K, h * (DP_E @ K)
+
+
+def _dopri5_interpolant(t0, h, state, K):
+    Q = K.T @ DP_P
+
+    def interp(t):
+        x = (t - t0) / h
+        return state + h * (Q @ (x ** np.arange(1, 5)))
+
+    return interp
+
+
+def dopri5_steps(state, t0, t_end, rtol, atol, h0, max_step=np.inf, min_step=1e-9):
+    """
+    Dormand–Prince 5(4) with per-component tolerances.
+
+    The step is accepted when the RMS of err / (atol + rtol * max(|y|, |y_new|))
+    is <= 1 and rescaled by 0.9 * err^(-1/5) (within [0.2, 10]). A step whose
+    stages hit a wall (ValueError from the force law) is rejected and halved.
+    Yields (t_old, t_new, new_state, interp, stats) per accepted step, where
+    interp(t) is the 4th-order dense output on [t_old, t_new] and stats["h"]
+    is the next trial step (restarting from t_new with it continues the run
+    exactly).
+    """
+    t = t0
+    f0 = deriv(state)
+    h = min(h0, max_step, t_end - t0)
+    stats = {"accepted": 0, "rejected": 0, "evals": 1}
+    wall = None
+    while t < t_end:
+        h = min(h, max_step, t_end - t)
+        if h < min_step:
+            if wall is not None:
+                raise wall
+            raise ValueError(f"step size fell below {min_step:.1e} s at t = {t:.6g} s")
+        try:
+            new_state, K, err = _dopri5_step(state, f0, h)
+            stats["evals"] += 6
+            wall = None
+        except ValueError as exc:
+            stats["rejected"] += 1
+            wall = exc
+            h *= 0.5
+            continue
+
+        scale = atol + rtol * np.maximum(np.abs(state), np.abs(new_state))
+        err_norm = np.sqrt(np.mean((err / scale) ** 2))
+        if err_norm > 1.0:
+            stats["rejected"] += 1
+            h *= max(MIN_FACTOR, SAFETY * err_norm ** -0.2)
+            continue
+
+        stats["accepted"] += 1
+        interp = _dopri5_interpolant(t, h, state, K)
+        t_old, t = t, t + h
+        state, f0 = new_state, K[6]
+        factor = MAX_FACTOR if err_norm == 0.0 else min(MAX_FACTOR, SAFETY * err_norm ** -0.2)
+        h *= factor
+        stats["h"] = h
+        yield t_old, t, state, interp, stats
+
+
+def implicit_steps(method, state, t0, t_end, rtol, atol, h0, max_step=np.inf):
+    """
+    Stiffly stable stepping with scipy's Radau or BDF, same yield protocol
+    as dopri5_steps. The Newton iterations use the analytic sparse Jacobian
+    STACK.state_jacobian instead of finite differences. A ValueError from
+    the force law inside the Newton iterations aborts the run.
+    """
+    from scipy.integrate import BDF, Radau
+
+    solver_cls = {"radau": Radau, "bdf": BDF}[method]
+    stats = {"accepted": 0, "rejected": 0, "evals": 0, "jacobians": 0}
+
+    def fun(_t, y):
+        stats["evals"] += 1
+        return deriv(y)
+
+    def jac(_t, y):
+        stats["jacobians"] += 1
+        return STACK.state_jacobian(y, BASE_POSITIONS, C_DAMP)
+
+    solver = solver_cls(
+        fun, t0, state, t_end, rtol=rtol, atol=atol, jac=jac,
+        first_step=min(h0, t_end - t0), max_step=max_step,
+    )
+    while solver.status == "running":
+        message = solver.step()
+        if solver.status == "failed":
+            raise ValueError(f"{method} failed at t = {solver.t:.6g} s: {message}")
+        stats["accepted"] += 1
+        stats["h"] = solver.step_size
+        yield solver.t_old, solver.t, solver.y, solver.dense_output(), stats
+
+
 # ----------------------------------------------------
 # Time simulation
 # ----------------------------------------------------
 
+def _parse_args():
+    parser = argparse.ArgumentParser(
+        description="Multi-shell friction-buffer time simulation."
+    )
+    parser.add_argument("run_dir", help="Run directory containing inputs.yaml.")
+    parser.add_argument(
+        "--resume",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="CHECKPOINT",
+        help="Continue from a checkpoint (default: the run's output.checkpoint.file).",
+    )
+    return parser.parse_args()
+
+
+def _check_checkpoint(ckpt, stack, base_positions, setup):
+    """
+    Refuse to resume a checkpoint written for a different setup.
+
+    `setup` maps the run settings saved with the checkpoint (dt,
+    integrator, damping, fr_fudge, force_kernel, rtol, atol) to their
+    current values.
+    """
+    mismatches = []
+    if ckpt["state"].size != 5 * stack.n_move:
+        mismatches.append(f"{ckpt['state'].size // 5 + 2} shells")
+    else:
+        if not (np.allclose(ckpt["radii"], stack.radii) and np.allclose(ckpt["masses"], stack.masses)):
+            mismatches.append("stack radii/masses")
+        if not np.allclose(ckpt["base_positions"], base_positions, rtol=0.0, atol=1e-12):
+            mismatches.append("base positions (hull/outer offsets)")
+    for name, value in setup.items():
+        if name not in ckpt:
+            mismatches.append(f"{name} (not saved)")
+            continue
+        saved = ckpt[name]
+        if isinstance(value, str):
+            same = str(saved) == value
+        else:
+            same = np.shape(saved) == np.shape(value) and np.array_equal(saved, value)
+        if not same:
+            mismatches.append(f"{name} = {saved if saved.ndim == 0 else 'array'}")
+    if mismatches:
+        raise ValueError("Checkpoint was written for a different setup: " + ", ".join(mismatches))
+
+
 def main():
-    global C_DAMP
-    if len(sys.argv) != 2:
-        run_script = Path(__file__).name
-        print(f"Usage: python {run_script} RUN_DIRECTORY", file=sys.stderr)
-        sys.exit(1)
+    global C_DAMP, STACK, BASE_POSITIONS
+    args = _parse_args()
 
-    run_dir = Path(sys.argv[1]).expanduser().resolve()
+    run_dir = Path(args.run_dir).expanduser().resolve()
     if not run_dir.is_dir():
         raise FileNotFoundError(f"Run directory {run_dir} does not exist.")
 
@@ -241,20 +371,39 @@ def main():
     total_time = float(sim_cfg.get("total_time", 1000.0))
     print_interval = float(sim_cfg.get("print_interval", 2.0))
     damping = float(sim_cfg.get("damping", C_DAMP))
+    integrator = str(sim_cfg.get("integrator", "dopri5")).lower()
+    rtol = float(sim_cfg.get("rtol", 1e-6))
+    atol_position = float(sim_cfg.get("atol_position", 1e-6))
+    atol_velocity = float(sim_cfg.get("atol_velocity", 1e-9))
+    atol_omega = float(sim_cfg.get("atol_omega", 1e-12))
+    max_step = float(sim_cfg.get("max_step", np.inf))
+    stack = FrictionBufferStack.from_config(config.get("stack", {}))
+    n_shells = stack.n_shells
+    n_move = stack.n_move
+    moving_indices = list(stack.moving)
     track_shells = sim_cfg.get("track_shells", [1, 5, 10, 15])
-    track_shells = [int(s) for s in track_shells if 1 <= s <= N_SHELLS - 2]
+    track_shells = [int(s) for s in track_shells if 1 <= s <= n_shells - 2]
     forces_cfg = config.get("forces", {})
     fr_fudge = float(forces_cfg.get("radial_fudge", 1.0))
+    force_kernel = str(forces_cfg.get("kernel", "analytic"))
 
     if dt <= 0.0:
         raise ValueError("simulation.dt must be positive.")
     if total_time <= 0.0:
         raise ValueError("simulation.total_time must be positive.")
+    if integrator not in INTEGRATORS:
+        raise ValueError(f"simulation.integrator must be one of {INTEGRATORS}.")
 
     C_DAMP = damping
+    STACK = stack
     set_radial_fudge_factor(fr_fudge)
+    set_force_kernel(force_kernel)
+    print(
+        f"[stack] {n_shells} shells, R = {stack.radii[0]:.1f} .. {stack.radii[-1]:.1f} m, "
+        f"{n_move} moving, total buffer mass {stack.masses.sum():.4e} kg"
+    )
 
-    base_positions = np.zeros((N_SHELLS, 2))
+    base_positions = np.zeros((n_shells, 2))
     base_positions[-1, 0] = outer_offset
     base_positions[0, 0] = hull_offset
     base_force = 0.0
@@ -262,83 +411,205 @@ def main():
         result = solve_static_offsets(
             hull_offset=hull_offset,
             outer_offset=outer_offset,
+            stack=stack,
         )
         base_positions[:, 0] = result.offsets
         base_force = result.target_force
         print(f"[steady-offset] gap |Fr| = {base_force:.6e} N")
 
-    BASE_POSITIONS[:] = base_positions
-
-    pos0 = base_positions[moving_indices].copy()
-    if n_move > 0:
-        pos0[0, 0] += initial_perturb
-
-    vel0 = np.zeros((n_move, 2))
-    omega0 = SHELL_OMEGA_STEADY[moving_indices]
+    BASE_POSITIONS = base_positions
 
-    state = np.concatenate([pos0.reshape(-1), vel0.reshape(-1), omega0])
+    output_cfg = config.get("output", {})
+    ckpt_cfg = output_cfg.get("checkpoint", {})
+    traj_cfg = output_cfg.get("trajectory", {})
+    checkpoint_path = run_dir / str(ckpt_cfg.get("file", "checkpoint.npz"))
+    checkpoint_interval = float(ckpt_cfg.get("interval", 600.0))
+    traj_interval = float(traj_cfg.get("interval", 1.0))
+    traj_stride = max(1, int(round(traj_interval / dt))) if traj_interval > 0.0 else 0
 
+    state = stack.initial_state(base_positions, initial_perturb)
+    t_state = 0.0  # time of `state` (the last accepted step)
+    h = dt
+    n_last = 0
     n_steps = max(1, int(np.ceil(total_time / dt)))
-    times = np.zeros(n_steps + 1)
 
+    atol = np.concatenate([
+        np.full(2 * n_move, atol_position),
+        np.full(2 * n_move, atol_velocity),
+        np.full(n_move, atol_omega),
+    ])
+    setup = {
+        "dt": dt,
+        "integrator": integrator,
+        "damping": damping,
+        "fr_fudge": fr_fudge,
+        "force_kernel": force_kernel,
+    }
+    if integrator != "rk4":
+        setup.update(rtol=rtol, atol=atol)
+
+    ckpt = None
+    if args.resume is not None:
+        resume_path = Path(args.resume).expanduser().resolve() if args.resume else checkpoint_path
+        ckpt = load_checkpoint(resume_path)
+        _check_checkpoint(ckpt, stack, base_positions, setup)
+        state = ckpt["state"]
+        t_state = float(ckpt["t"])
+        h = float(ckpt["h"])
+        n_last = int(ckpt["n"])
+        resumed_shells = [int(s) for s in ckpt["track_shells"]]
+        if resumed_shells != track_shells:
+            print(f"[resume] keeping the checkpoint's track_shells {resumed_shells}")
+            track_shells = resumed_shells
+        print(f"[resume] {resume_path}: t = {t_state:.3f} s, step {n_last} ({ckpt['status']})")
+        n_steps = max(n_steps, n_last)
+
+    # Dense histories of the tracked shells (for the plots): x, y, ω per sample.
+    times = np.zeros(n_steps + 1)
     track_idx = [moving_indices.index(s) for s in track_shells]
-    xs = {s: np.zeros(n_steps + 1) for s in track_shells}
-    ys = {s: np.zeros(n_steps + 1) for s in track_shells}
-    omegas = {s: np.zeros(n_steps + 1) for s in track_shells}
-
-    for s, j in zip(track_shells, track_idx):
-        xs[s][0] = pos0[j, 0]
-        ys[s][0] = pos0[j, 1]
-        omegas[s][0] = omega0[j]
+    track = np.zeros((n_steps + 1, len(track_shells), 3))
+    if ckpt is not None:
+        times[:n_last+1] = ckpt["times"]
+        track[:n_last+1] = ckpt["track"]
+
+    # Decimated trajectory of every moving shell, appended as the run goes.
+    writer = None
+    if traj_stride:
+        columns = trajectory_columns(n_move)
+        if ckpt is not None and str(ckpt["trajectory_file"]):
+            traj_stride = int(ckpt["trajectory_stride"])
+            writer = TrajectoryWriter(
+                run_dir / str(ckpt["trajectory_file"]), len(columns), rows=int(ckpt["trajectory_rows"])
+            )
+        else:
+            writer = TrajectoryWriter(
+                next_available_path(run_dir, str(traj_cfg.get("file", "trajectory.npy"))),
+                len(columns),
+                metadata={"columns": columns, "dt": dt, "stride": traj_stride, "radii": stack.radii.tolist()},
+            )
+        print(f"[output] streaming every {traj_stride * dt:g} s of all {n_move} moving shells to {writer.path}")
 
-    t = 0.0
-    n_last = 0
     next_print = (
         time.perf_counter() + print_interval if print_interval > 0.0 else None
     )
+    next_checkpoint = (
+        time.perf_counter() + checkpoint_interval if checkpoint_interval > 0.0 else None
+    )
+
+    def record(n, t, state):
+        nonlocal next_print
+        times[n] = t
+
+        pos = state[:2*n_move].reshape((n_move, 2))
+        vel = state[2*n_move:4*n_move].reshape((n_move, 2))
+        omega = state[4*n_move:]
+
+        track[n, :, :2] = pos[track_idx]
+        track[n, :, 2] = omega[track_idx]
+        if writer is not None and n % traj_stride == 0:
+            writer.append(np.concatenate(([t], state)))
+
+        if next_print is None:
+            return
+        now = time.perf_counter()
+        if now < next_print:
+            return
+        max_disp = np.max(np.linalg.norm(pos, axis=1)) if pos.size else 0.0
+        avg_speed = np.mean(np.linalg.norm(vel, axis=1)) if n_move else 0.0
+        avg_omega = np.mean(omega) if omega.size else 0.0
+        print(
+            f"[progress] sim t = {t:9.1f}s / {total_time:9.1f}s "
+            f"({100 * t / total_time:5.1f}%)  |  "
+            f"max|pos| = {max_disp:7.3f} m, avg|vel| = {avg_speed:7.3f} m/s, "
+            f"avg ω = {avg_omega:7.4f} rad/s"
+        )
+        next_print = now + print_interval
+
+    def checkpoint(status):
+        if writer is not None:
+            writer.flush()
+        save_checkpoint(
+            checkpoint_path,
+            status=np.array(status),
+            t=t_state,
+            h=h,
+            n=n_last,
+            state=state,
+            times=times[:n_last+1],
+            track=track[:n_last+1],
+            track_shells=np.array(track_shells, dtype=int),
+            base_positions=base_positions,
+            radii=stack.radii,
+            masses=stack.masses,
+            **{name: np.array(value) for name, value in setup.items()},
+            trajectory_file=np.array(writer.path.name if writer is not None else ""),
+            trajectory_rows=writer.rows if writer is not None else 0,
+            trajectory_stride=traj_stride,
+        )
 
+    def checkpoint_due():
+        nonlocal next_checkpoint
+        if next_checkpoint is None or time.perf_counter() < next_checkpoint:
+            return
+        checkpoint("running")
+        next_checkpoint = time.perf_counter() + checkpoint_interval
+
+    if ckpt is None:
+        record(0, 0.0, state)
+
+    stats = None
+    status = "completed"
     try:
-        for n in range(1, n_steps + 1):
-            state = rk4_step_adaptive(state, dt, depth=8)
-            t += dt
-
-            times[n] = t
-            n_last = n
-
-            pos = state[:2*n_move].reshape((n_move, 2))
-            vel = state[2*n_move:4*n_move].reshape((n_move, 2))
-            omega = state[4*n_move:]
-
-            for s, j in zip(track_shells, track_idx):
-                xs[s][n] = pos[j, 0]
-                ys[s][n] = pos[j, 1]
-                omegas[s][n] = omega[j]
-
-            if next_print is not None:
-                now = time.perf_counter()
-                if now < next_print:
-                    continue
-                max_disp = np.max(np.linalg.norm(pos, axis=1)) if pos.size else 0.0
-                avg_speed = np.mean(np.linalg.norm(vel, axis=1)) if n_move else 0.0
-                avg_omega = np.mean(omega) if omega.size else 0.0
-                print(
-                    f"[progress] sim t = {t:9.1f}s / {total_time:9.1f}s "
-                    f"({100 * t / total_time:5.1f}%)  |  "
-                    f"max|pos| = {max_disp:7.3f} m, avg|vel| = {avg_speed:7.3f} m/s, "
-                    f"avg ω = {avg_omega:7.4f} rad/s"
-                )
-                next_print = now + print_interval
+        if integrator == "rk4":
+            t = t_state
+            for n in range(n_last + 1, n_steps + 1):
+                state = rk4_step_adaptive(state, dt, depth=8)
+                t += dt
+                record(n, t, state)
+                t_state, n_last = t, n
+                checkpoint_due()
+        elif n_last < n_steps:
+            # Adaptive steps; samples on the dt grid come from the dense output.
+            t_end = n_steps * dt
+            if integrator == "dopri5":
+                steps = dopri5_steps(state, t_state, t_end, rtol, atol, h0=h, max_step=max_step)
+            else:
+                steps = implicit_steps(integrator, state, t_state, t_end, rtol, atol, h0=h, max_step=max_step)
+            for _, t_new, y_new, interp, stats in steps:
+                while n_last < n_steps and (n_last + 1) * dt <= t_new * (1.0 + 1e-12):
+                    n = n_last + 1
+                    t_n = min(n * dt, t_new)
+                    record(n, t_n, y_new if t_n == t_new else interp(t_n))
+                    n_last = n
+                state, t_state, h = y_new, t_new, stats["h"]
+                checkpoint_due()
 
     except ValueError as exc:
+        status = "aborted"
         print(f"\nSimulation aborted at step {n_last}, t ≈ {times[n_last]:.3f} s")
         print(f"Reason: {exc}")
+    except KeyboardInterrupt:
+        status = "interrupted"
+        print(f"\nSimulation interrupted at step {n_last}, t ≈ {times[n_last]:.3f} s")
+
+    checkpoint(status)
+    print(f"[output] checkpoint ({status}) saved {checkpoint_path}")
+    if writer is not None:
+        print(f"[output] trajectory: {writer.rows} rows in {writer.path}")
+
+    if stats is not None:
+        print(
+            f"[integrator] {integrator}: {stats['accepted']} accepted / "
+            f"{stats['rejected']} rejected steps, {stats['evals']} force evaluations"
+            + (f", {stats['jacobians']} Jacobians" if "jacobians" in stats else "")
+        )
 
     times_plot = times[:n_last+1]
-    xs_plot = {s: arr[:n_last+1] for s, arr in xs.items()}
-    ys_plot = {s: arr[:n_last+1] for s, arr in ys.items()}
-    omega_plot = {s: arr[:n_last+1] for s, arr in omegas.items()}
+    xs_plot = {s: track[:n_last+1, k, 0] for k, s in enumerate(track_shells)}
+    ys_plot = {s: track[:n_last+1, k, 1] for k, s in enumerate(track_shells)}
+    omega_plot = {s: track[:n_last+1, k, 2] for k, s in enumerate(track_shells)}
 
-    plot_cfg = config.get("output", {}).get("plots", {})
+    plot_cfg = output_cfg.get("plots", {})
     filename_x = plot_cfg.get("x_time", "x_time.png")
     filename_y = plot_cfg.get("y_time", "y_time.png")
     filename_xy = plot_cfg.get("xy", "trajectories.png")
@@ -1,5 +1,13 @@
+from dataclasses import dataclass
+from functools import lru_cache
+
 import numpy as np
 
+try:
+    from scipy.interpolate import PchipInterpolator
+except ImportError:
+    PchipInterpolator = None
+
 try:
     from scipy.integrate import cumulative_trapezoid, simpson
 except ImportError:
@@ -79,6 +87,17 @@ U_rel = np.abs(shell_linear_speed[:-1] - shell_linear_speed[1:])
 
 FR_FUDGE = 1.0  # multiplier on radial force component
 
+# Gap force kernel: "analytic" uses the closed-form half-Sommerfeld integrals,
+# "numerical" integrates the pressure profile on THETA_GRID (reference mode),
+# "table" interpolates the numerical curves precomputed once over eps.
+FORCE_KERNELS = ("analytic", "numerical", "table")
+FORCE_KERNEL = "analytic"
+
+# Dimensionless force table: nodes clustered toward eps -> 1.
+FORCE_TABLE_SIZE = 257
+FORCE_TABLE_EPS_MIN = 1e-3
+FORCE_TABLE_EPS_MAX = 0.999
+
 
 # Pre-compute a θ-grid for the long-bearing integrals
 N_THETA = 2049  # odd number so Simpson's rule applies cleanly
@@ -96,6 +115,18 @@ def set_radial_fudge_factor(value: float) -> None:
     FR_FUDGE = float(value)
 
 
+def set_force_kernel(name: str) -> None:
+    """
+    Select the gap force kernel: "analytic" (closed-form half-Sommerfeld),
+    "numerical" (integrated pressure profile) or "table" (interpolated
+    precomputed numerical curves).
+    """
+    global FORCE_KERNEL
+    if name not in FORCE_KERNELS:
+        raise ValueError(f"Unknown force kernel {name!r}; expected one of {FORCE_KERNELS}")
+    FORCE_KERNEL = name
+
+
 # ---------------------------
 # Single-gap wedge force law
 # ---------------------------
@@ -169,6 +200,170 @@ def _long_bearing_pressure_components(e, c, mu, u_rel, L, r_inner):
     return Fr, Ft
 
 
+def half_sommerfeld_coefficients(eps):
+    """
+    Dimensionless (fr, ft) of the long-bearing solution for eccentricity
+    ratios eps in [0, 1), array-capable.
+
+    The mean-free full-Sommerfeld pressure is
+
+        p = P * eps sinθ (2 + eps cosθ) / ((2 + eps^2) (1 + eps cosθ)^2),
+        P = 6 μ U r / c^2,
+
+    which is positive exactly on 0 < θ < π, so clipping the tension side is
+    the half-Sommerfeld condition and the cosθ / sinθ projections close to
+
+        fr = -2 eps^2 / ((2 + eps^2) (1 - eps^2)),
+        ft = π eps / ((2 + eps^2) sqrt(1 - eps^2)).
+
+    Forces are (Fr, Ft) = gap_force_scale(...) * (fr, ft).
+    """
+    eps2 = eps * eps
+    denom = (2.0 + eps2) * (1.0 - eps2)
+    fr = -2.0 * eps2 / denom
+    ft = np.pi * eps * np.sqrt(1.0 - eps2) / denom
+    return fr, ft
+
+
+def _reference_coefficients(eps):
+    """
+    Dimensionless (fr, ft) from the numerical reference integration
+    (scale = 1 via c = r = L = u = 1, mu = 1/6).
+    """
+    return _long_bearing_pressure_components(eps, 1.0, 1.0 / 6.0, 1.0, 1.0, 1.0)
+
+
+def _regularised(eps, fr, ft):
+    # fr ~ eps^2 / (1 - eps^2) and ft ~ eps / sqrt(1 - eps^2) at both ends;
+    # dividing those factors out leaves O(1) curves smooth on [0, 1].
+    return fr * (1.0 - eps**2) / eps**2, ft * np.sqrt(1.0 - eps**2) / eps
+
+
+@lru_cache(maxsize=None)
+def _force_table():
+    """
+    Build the dimensionless force table once from the numerical kernel.
+
+    Nodes run from FORCE_TABLE_EPS_MIN to FORCE_TABLE_EPS_MAX, clustered
+    toward eps -> 1, and hold the regularised curves
+    a_r = fr (1 - eps^2) / eps^2 and a_t = ft sqrt(1 - eps^2) / eps.
+    Queries outside the node range clamp a_r, a_t to the end nodes, which
+    keeps the leading-order behaviour at both ends.
+    Returns (interp_r, interp_t, error_bound).
+    """
+    s = np.linspace(0.0, 1.0, FORCE_TABLE_SIZE)
+    eps = FORCE_TABLE_EPS_MIN + (FORCE_TABLE_EPS_MAX - FORCE_TABLE_EPS_MIN) * (1.0 - (1.0 - s) ** 2)
+    a_r, a_t = _regularised(eps, *np.array([_reference_coefficients(x) for x in eps]).T)
+
+    if PchipInterpolator is not None:
+        interp_r = PchipInterpolator(eps, a_r)
+        interp_t = PchipInterpolator(eps, a_t)
+    else:
+        def interp_r(x):
+            return np.interp(x, eps, a_r)
+
+        def interp_t(x):
+            return np.interp(x, eps, a_t)
+
+    # a_r, a_t are bounded away from zero, so the worst relative miss at the
+    # interval midpoints bounds the relative error of Fr and Ft on the range.
+    mid = 0.5 * (eps[1:] + eps[:-1])
+    ref_r, ref_t = _regularised(mid, *np.array([_reference_coefficients(x) for x in mid]).T)
+    err_r = np.max(np.abs(interp_r(mid) / ref_r - 1.0))
+    err_t = np.max(np.abs(interp_t(mid) / ref_t - 1.0))
+    return interp_r, interp_t, float(max(err_r, err_t))
+
+
+def force_table_error_bound():
+    """
+    Relative interpolation error of the "table" kernel against the
+    numerical kernel on [FORCE_TABLE_EPS_MIN, FORCE_TABLE_EPS_MAX].
+    """
+    return _force_table()[2]
+
+
+def tabulated_coefficients(eps):
+    """
+    Dimensionless (fr, ft) interpolated from the precomputed table,
+    array-capable.
+    """
+    interp_r, interp_t, _ = _force_table()
+    x = np.clip(eps, FORCE_TABLE_EPS_MIN, FORCE_TABLE_EPS_MAX)
+    eps2 = eps * eps
+    fr = interp_r(x) * eps2 / (1.0 - eps2)
+    ft = interp_t(x) * eps / np.sqrt(1.0 - eps2)
+    return fr, ft
+
+
+def half_sommerfeld_derivatives(eps):
+    """
+    Derivatives (dfr/deps, dft/deps) of half_sommerfeld_coefficients:
+
+        dfr = -4 eps (2 + eps^4) / ((2 + eps^2) (1 - eps^2))^2,
+        dft = π (2 - eps^2 + 2 eps^4) / ((2 + eps^2)^2 (1 - eps^2)^{3/2}).
+    """
+    eps2 = eps * eps
+    one_minus = 1.0 - eps2
+    denom = (2.0 + eps2) * one_minus
+    dfr = -4.0 * eps * (2.0 + eps2 * eps2) / (denom * denom)
+    dft = np.pi * (2.0 - eps2 + 2.0 * eps2 * eps2) / ((2.0 + eps2) ** 2 * one_minus * np.sqrt(one_minus))
+    return dfr, dft
+
+
+def _coefficients_over_eps(eps):
+    # (fr / eps, ft / eps), finite at eps = 0 (limits 0 and π/2).
+    eps2 = eps * eps
+    fr_e = -2.0 * eps / ((2.0 + eps2) * (1.0 - eps2))
+    ft_e = np.pi / ((2.0 + eps2) * np.sqrt(1.0 - eps2))
+    return fr_e, ft_e
+
+
+def gap_force_scale(c, mu, u_rel, L, r_inner):
+    """
+    Force scale r L P = 6 μ U r^2 L / c^2 shared by Fr and Ft.
+    """
+    return 6.0 * mu * u_rel * r_inner * r_inner * L / (c * c)
+
+
+def gap_force_magnitudes_array(e, c, mu, u_rel, L, r_inner, fr_fudge=None):
+    """
+    Array version of gap_force_magnitudes: all arguments broadcast together
+    and (Fr, Ft) come back with the broadcast shape. Gaps with e <= 0 carry
+    no force; any eps >= 1 raises ValueError. fr_fudge (broadcastable)
+    replaces FR_FUDGE, e.g. one factor per ensemble member.
+    """
+    e = np.asarray(e, dtype=float)
+    eps = np.maximum(e, 0.0) / c
+    if np.any(eps >= 1.0):
+        k = int(np.argmax(eps >= 1.0))
+        e_b, c_b = np.broadcast_arrays(e, np.asarray(c, dtype=float))
+        raise ValueError(
+            f"Offset e={e_b.flat[k]} exceeds or equals clearance c={c_b.flat[k]}"
+        )
+
+    if FORCE_KERNEL == "numerical":
+        e, c, mu, u_rel, L, r_inner = np.broadcast_arrays(
+            *(np.asarray(v, dtype=float) for v in (e, c, mu, u_rel, L, r_inner))
+        )
+        eps = np.broadcast_to(eps, e.shape)
+        Fr = np.zeros(eps.shape)
+        Ft = np.zeros(eps.shape)
+        for k in np.flatnonzero(eps > 0.0):
+            Fr.flat[k], Ft.flat[k] = _long_bearing_pressure_components(
+                e.flat[k], c.flat[k], mu.flat[k], u_rel.flat[k], L.flat[k], r_inner.flat[k]
+            )
+    else:
+        if FORCE_KERNEL == "table":
+            fr, ft = tabulated_coefficients(eps)
+        else:
+            fr, ft = half_sommerfeld_coefficients(eps)
+        scale = gap_force_scale(c, mu, u_rel, L, r_inner)
+        Fr = scale * fr
+        Ft = scale * ft
+
+    return Fr * (FR_FUDGE if fr_fudge is None else fr_fudge), Ft
+
+
 def gap_force_magnitudes(e, c, mu, u_rel, L, r_inner):
     """
     Return (Fr, Ft) for a single gap using the long-bearing
@@ -185,7 +380,15 @@ def gap_force_magnitudes(e, c, mu, u_rel, L, r_inner):
     if eps >= 1.0:
         raise ValueError(f"Offset e={e} exceeds or equals clearance c={c}")
 
-    Fr, Ft = _long_bearing_pressure_components(e, c, mu, u_rel, L, r_inner)
+    if FORCE_KERNEL == "numerical":
+        Fr, Ft = _long_bearing_pressure_components(e, c, mu, u_rel, L, r_inner)
+    else:
+        if FORCE_KERNEL == "table":
+            fr, ft = tabulated_coefficients(eps)
+        else:
+            fr, ft = half_sommerfeld_coefficients(eps)
+        scale = gap_force_scale(c, mu, u_rel, L, r_inner)
+        Fr, Ft = scale * fr, scale * ft
     Fr *= FR_FUDGE
 
     return Fr, Ft
@@ -222,45 +425,153 @@ def gap_force_vector(r_inner_center, r_outer_center, c, mu, u_rel, L, r_inner_ra
 # Multi-shell total fluid forces
 # ---------------------------
 
-def total_fluid_forces(q, C, MU, U_rel, L):
+class ForceWorkspace:
+    """
+    Preallocated per-gap buffers for total_fluid_forces(..., work=...) on a
+    single configuration of n_shells shells. With the analytic kernel the
+    forces are then evaluated without temporaries; the returned array is
+    the workspace's `forces` buffer, overwritten by the next call.
+    """
+
+    def __init__(self, n_shells):
+        n_gaps = n_shells - 1
+        self.d = np.empty((n_gaps, 2))
+        self.e = np.empty(n_gaps)
+        self.eps = np.empty(n_gaps)
+        self.eps2 = np.empty(n_gaps)
+        self.g = np.empty(n_gaps)
+        self.h = np.empty(n_gaps)
+        self.scale = np.empty(n_gaps)
+        self.fr_e = np.empty(n_gaps)
+        self.ft_e = np.empty(n_gaps)
+        self.tmp = np.empty(n_gaps)
+        self.touching = np.empty(n_gaps, dtype=bool)
+        self.gap_forces = np.empty((n_gaps, 2))
+        self.forces = np.empty(2 * n_shells)
+
+
+def _total_fluid_forces_into(q, C, MU, U_rel, L, r, fudge, work):
+    """
+    total_fluid_forces for one configuration and the analytic kernel, in
+    the buffers of `work`. With F_s / c per metre of offset,
+
+        Fr / e = (F_s / c) fr / eps,   Ft / e = (F_s / c) ft / eps,
+
+    which stay finite at e = 0 (see _coefficients_over_eps).
+    """
+    pos = q.reshape(-1, 2)
+    d, e = work.d, work.e
+    np.subtract(pos[:-1], pos[1:], out=d)
+    np.hypot(d[:, 0], d[:, 1], out=e)
+    np.greater_equal(e, C, out=work.touching)
+    if work.touching.any():
+        i = int(np.argmax(work.touching))
+        raise ValueError(
+            f"gap {i} between shells {i} and {i+1}: "
+            f"Offset e={e[i]} exceeds or equals clearance c={np.broadcast_to(C, e.shape)[i]}"
+        )
+
+    eps, eps2, g, h = work.eps, work.eps2, work.g, work.h
+    np.divide(e, C, out=eps)
+    np.multiply(eps, eps, out=eps2)
+    np.add(eps2, 2.0, out=g)
+    np.subtract(1.0, eps2, out=h)
+
+    # Per-metre scale 6 μ U r^2 L / c^3.
+    scale = work.scale
+    np.multiply(r, r, out=scale)
+    scale *= 6.0 * MU * L
+    scale *= U_rel
+    scale /= C
+    scale /= C
+    scale /= C
+
+    fr_e, ft_e = work.fr_e, work.ft_e
+    np.multiply(g, h, out=fr_e)
+    np.divide(eps, fr_e, out=fr_e)
+    fr_e *= -2.0 * fudge
+    fr_e *= scale
+    np.sqrt(h, out=h)
+    np.multiply(g, h, out=ft_e)
+    np.divide(np.pi, ft_e, out=ft_e)
+    ft_e *= scale
+
+    F_gap, tmp = work.gap_forces, work.tmp
+    np.multiply(fr_e, d[:, 0], out=F_gap[:, 0])
+    np.multiply(ft_e, d[:, 1], out=tmp)
+    F_gap[:, 0] -= tmp
+    np.multiply(fr_e, d[:, 1], out=F_gap[:, 1])
+    np.multiply(ft_e, d[:, 0], out=tmp)
+    F_gap[:, 1] += tmp
+
+    F = work.forces.reshape(-1, 2)
+    F[:-1] = F_gap
+    F[-1] = 0.0
+    F[1:] -= F_gap
+    return work.forces
+
+
+def total_fluid_forces(q, C, MU, U_rel, L, radii=None, fr_fudge=None, work=None):
     """
     Compute fluid wedge forces on all shells for a given configuration q.
 
-    q: shape (2*N_SHELLS,), [x0,y0,x1,y1,...,x16,y16]
+    q: shape (2*N_SHELLS,), [x0,y0,x1,y1,...,x16,y16], or a batch of
+       configurations with shape (batch, 2*N_SHELLS)
     C: array of clearances for each gap, length = N_SHELLS - 1
     U_rel: array of relative speeds per gap, length = N_SHELLS - 1
+           (or (batch, N_SHELLS - 1) for per-configuration speeds)
     MU: viscosity
     L: axial length
+    radii: shell inner radii (default R); needed for stacks of other sizes
+    fr_fudge: radial multiplier replacing FR_FUDGE; (batch, 1) gives one per configuration
+    work: ForceWorkspace for repeated single-configuration calls; with the
+          analytic kernel and a scalar fr_fudge the result is its `forces`
+          buffer and no temporaries are allocated (other kernels ignore it)
 
     Returns: F, same shape as q, fluid force on each shell (inner + outer contributions).
+
+    All gaps (and all configurations) are evaluated in one array pass:
+    centre differences give eccentricities and (er, et) bases, the gap
+    force law is applied to the whole array, and each gap force is added
+    to its inner shell and subtracted from its outer shell.
     """
-    F = np.zeros_like(q)
-
-    for i in range(N_SHELLS - 1):
-        # Inner & outer shell center positions
-        r_inner = q[2*i:2*i+2]
-        r_outer = q[2*(i+1):2*(i+1)+2]
-
-        try:
-            F_inner = gap_force_vector(
-                r_inner_center=r_inner,
-                r_outer_center=r_outer,
-                c=C[i],
-                mu=MU,
-                u_rel=U_rel[i],
-                L=L,
-                r_inner_radius=R[i],
-            )
-        except ValueError as exc:
-            raise ValueError(
-                f"gap {i} between shells {i} and {i+1}: {exc}"
-            ) from exc
+    q = np.asarray(q, dtype=float)
+    pos = q.reshape(q.shape[:-1] + (-1, 2))
+    n_gaps = pos.shape[-2] - 1
+    r = R[:n_gaps] if radii is None else np.asarray(radii, dtype=float)[:n_gaps]
+
+    if work is not None and FORCE_KERNEL == "analytic" and q.ndim == 1 and np.ndim(fr_fudge) == 0:
+        fudge = FR_FUDGE if fr_fudge is None else float(fr_fudge)
+        return _total_fluid_forces_into(q, C, MU, U_rel, L, r, fudge, work)
+
+    d = pos[..., :-1, :] - pos[..., 1:, :]
+    e = np.hypot(d[..., 0], d[..., 1])
+
+    touching = e >= C
+    if np.any(touching):
+        first = tuple(np.argwhere(touching)[0])
+        i = first[-1]
+        raise ValueError(
+            f"gap {i} between shells {i} and {i+1}: "
+            f"Offset e={e[first]} exceeds or equals clearance c={np.broadcast_to(C, e.shape)[first]}"
+        )
+
+    Fr, Ft = gap_force_magnitudes_array(e, C, MU, U_rel, L, r, fr_fudge=fr_fudge)
 
-        # Add to inner, subtract from outer (action-reaction)
-        F[2*i:2*i+2]      += F_inner
-        F[2*(i+1):2*(i+1)+2] -= F_inner
+    # er = d / e (inner -> outer line of centres), et = er rotated +90°;
+    # concentric gaps have Fr = Ft = 0 so their basis does not matter.
+    inv_e = 1.0 / np.where(e > 0.0, e, 1.0)
+    Fr_e = Fr * inv_e
+    Ft_e = Ft * inv_e
+    F_gap = np.empty_like(d)
+    F_gap[..., 0] = Fr_e * d[..., 0] - Ft_e * d[..., 1]
+    F_gap[..., 1] = Fr_e * d[..., 1] + Ft_e * d[..., 0]
 
-    return F
+    # Action-reaction: each gap pushes its inner shell and pulls its outer one.
+    F = np.zeros_like(pos)
+    F[..., :-1, :] += F_gap
+    F[..., 1:, :] -= F_gap
+    return F.reshape(q.shape)
 
 
 # ---------------------------
@@ -300,6 +611,223 @@ def build_stiffness_matrix(q0, C, MU, U_rel, L, h=1e-4):
     return K
 
 
+# ---------------------------
+# Analytic stiffness / damping (block-tridiagonal)
+# ---------------------------
+
+def _gap_geometry(q, C):
+    """
+    Per-gap centre difference d = r_inner - r_outer, eccentricity ratio and
+    the (er, et) basis; concentric gaps get er = +x (their blocks do not
+    depend on it).
+    """
+    pos = np.asarray(q, dtype=float).reshape(-1, 2)
+    d = pos[:-1] - pos[1:]
+    e = np.hypot(d[:, 0], d[:, 1])
+    eps = e / C
+    if np.any(eps >= 1.0):
+        i = int(np.argmax(eps >= 1.0))
+        raise ValueError(
+            f"gap {i} between shells {i} and {i+1}: "
+            f"Offset e={e[i]} exceeds or equals clearance c={np.broadcast_to(C, e.shape)[i]}"
+        )
+    safe = np.where(e > 0.0, e, 1.0)
+    er = np.where((e > 0.0)[:, None], d / safe[:, None], np.array([1.0, 0.0]))
+    et = np.stack([-er[:, 1], er[:, 0]], axis=1)
+    return eps, er, et
+
+
+def _outer(a, b):
+    return a[:, :, None] * b[:, None, :]
+
+
+def gap_stiffness_blocks(q0, C, MU, U_rel, L, radii=None):
+    """
+    Closed-form 2x2 blocks G_i = dF_i / dd_i of the gap force on the inner
+    shell with respect to d_i = r_i - r_{i+1}, shape (N_SHELLS - 1, 2, 2).
+
+    With F = Fr(e) er + Ft(e) et:
+
+        G = Fr' er er^T + (Fr/e) et et^T + Ft' et er^T - (Ft/e) er et^T,
+
+    which tends to (F_s π / 2c) J at e = 0 (pure cross-coupling).
+    Uses the half-Sommerfeld closed form whatever kernel is selected.
+    """
+    eps, er, et = _gap_geometry(q0, C)
+    r = R[:eps.size] if radii is None else np.asarray(radii, dtype=float)[:eps.size]
+    per_metre = gap_force_scale(C, MU, U_rel, L, r) / C
+    dfr, dft = half_sommerfeld_derivatives(eps)
+    fr_e, ft_e = _coefficients_over_eps(eps)
+    G = (
+        (FR_FUDGE * dfr)[:, None, None] * _outer(er, er)
+        + (FR_FUDGE * fr_e)[:, None, None] * _outer(et, et)
+        + dft[:, None, None] * _outer(et, er)
+        - ft_e[:, None, None] * _outer(er, et)
+    )
+    return per_metre[:, None, None] * G
+
+
+def gap_damping_blocks(q0, C, MU, U_rel, L, radii=None):
+    """
+    Closed-form 2x2 blocks B_i = dF_i / d(dd_i/dt) of the squeeze-film and
+    whirl terms, shape (N_SHELLS - 1, 2, 2).
+
+    A moving centre adds dh/dt = ḋ_r cosθ + ḋ_t sinθ to the long-bearing
+    Reynolds equation. The ḋ_t part acts as a slip U - 2 r ḋ_t / e; the ḋ_r
+    part is the full-film squeeze pressure. Both are projected over the
+    positive half-film 0 < θ < π as in the steady model. With
+    D_s = 12 μ r^3 L / c^3:
+
+        dFr/dḋ_r = -D_s (π/2) / (1 - eps^2)^{3/2}
+        dFt/dḋ_r = -D_s eps / ((1 + sqrt(1 - eps^2)) (1 - eps^2)^{3/2})
+        dFr/dḋ_t = -D_s fr / eps,   dFt/dḋ_t = -D_s ft / eps
+
+    At e = 0 this is isotropic damping 6 π μ r^3 L / c^3 (half the
+    full-film value). The blocks do not depend on U_rel; it is accepted
+    for a uniform signature.
+    """
+    eps, er, et = _gap_geometry(q0, C)
+    r = R[:eps.size] if radii is None else np.asarray(radii, dtype=float)[:eps.size]
+    damp_scale = 12.0 * MU * r**3 * L / C**3
+    one_minus = 1.0 - eps * eps
+    root = np.sqrt(one_minus)
+    b_rr = -0.5 * np.pi / (one_minus * root)
+    b_tr = -eps / ((1.0 + root) * one_minus * root)
+    fr_e, ft_e = _coefficients_over_eps(eps)
+    B = (
+        (FR_FUDGE * b_rr)[:, None, None] * _outer(er, er)
+        - (FR_FUDGE * fr_e)[:, None, None] * _outer(er, et)
+        + b_tr[:, None, None] * _outer(et, er)
+        - ft_e[:, None, None] * _outer(et, et)
+    )
+    return damp_scale[:, None, None] * B
+
+
+def assemble_gap_blocks(blocks, sparse=False):
+    """
+    Assemble per-gap blocks G_i = dF_i/dd_i into the global matrix
+    A = -dF/dq (or -dF/dq̇), which is block-tridiagonal because each gap
+    couples only shells i and i+1:
+
+        A_ii -= G_i,  A_i,i+1 += G_i,  A_i+1,i += G_i,  A_i+1,i+1 -= G_i.
+
+    Work is O(N). Returns a dense array, or a scipy.sparse CSR matrix with
+    sparse=True.
+    """
+    blocks = np.asarray(blocks, dtype=float)
+    n_gaps = blocks.shape[0]
+    n = 2 * (n_gaps + 1)
+    gaps = np.arange(n_gaps)
+    a, b = np.meshgrid(np.arange(2), np.arange(2), indexing="ij")
+    inner = 2 * gaps[:, None, None]
+    outer = inner + 2
+    rows = np.concatenate([(inner + a).ravel(), (inner + a).ravel(), (outer + a).ravel(), (outer + a).ravel()])
+    cols = np.concatenate([(inner + b).ravel(), (outer + b).ravel(), (inner + b).ravel(), (outer + b).ravel()])
+    vals = np.concatenate([-blocks.ravel(), blocks.ravel(), blocks.ravel(), -blocks.ravel()])
+
+    if sparse:
+        from scipy.sparse import coo_matrix
+
+        return coo_matrix((vals, (rows, cols)), shape=(n, n)).tocsr()
+    A = np.zeros((n, n))
+    np.add.at(A, (rows, cols), vals)
+    return A
+
+
+def stiffness_matrix(q0, C, MU, U_rel, L, sparse=False, radii=None):
+    """
+    Analytic K_{mn} = -dF_m/dq_n at q0 (same convention as
+    build_stiffness_matrix, without the 4 * N_SHELLS force evaluations).
+    radii overrides the shell radii R for stacks of other sizes.
+    """
+    return assemble_gap_blocks(gap_stiffness_blocks(q0, C, MU, U_rel, L, radii=radii), sparse=sparse)
+
+
+def damping_matrix(q0, C, MU, U_rel, L, sparse=False, radii=None):
+    """
+    Analytic squeeze-film / whirl damping D_{mn} = -dF_m/dq̇_n at q0.
+    """
+    return assemble_gap_blocks(gap_damping_blocks(q0, C, MU, U_rel, L, radii=radii), sparse=sparse)
+
+
+@dataclass
+class LinearStability:
+    eigenvalues: np.ndarray  # sorted by decreasing real part [1/s]
+    growth_rate: float  # largest real part [1/s]
+    whirl_frequency: float  # |imaginary part| of that mode [rad/s]
+    stable: bool
+
+
+def state_matrix_stability(A, rtol=1e-9):
+    """
+    Summarise the eigenvalues of a first-order state matrix A (dense).
+
+    A mode counts as growing when Re(λ) > rtol * max|λ| (neutral modes
+    sit at round-off).
+    """
+    lam = np.linalg.eigvals(A)
+    lam = lam[np.argsort(-lam.real)]
+    growth = float(lam[0].real)
+    tol = rtol * float(np.max(np.abs(lam))) if lam.size else 0.0
+    return LinearStability(
+        eigenvalues=lam,
+        growth_rate=growth,
+        whirl_frequency=float(abs(lam[0].imag)),
+        stable=growth <= tol,
+    )
+
+
+def linear_stability(masses, K, D, free=None, rtol=1e-9):
+    """
+    Eigenvalues of M q̈ + D q̇ + K q = 0 restricted to the moving shells.
+
+    masses: per-shell masses, length = number of shells in `free`
+    K, D: global (2N x 2N) stiffness and damping, dense or sparse
+    free: indices of moving shells (default: all shells)
+    """
+    K = K.toarray() if hasattr(K, "toarray") else np.asarray(K, dtype=float)
+    D = D.toarray() if hasattr(D, "toarray") else np.asarray(D, dtype=float)
+    if free is None:
+        free = np.arange(K.shape[0] // 2)
+    dofs = (2 * np.asarray(free)[:, None] + np.arange(2)).ravel()
+    inv_m = 1.0 / np.repeat(np.asarray(masses, dtype=float), 2)
+    n = dofs.size
+
+    A = np.zeros((2 * n, 2 * n))
+    A[:n, n:] = np.eye(n)
+    A[n:, :n] = -inv_m[:, None] * K[np.ix_(dofs, dofs)]
+    A[n:, n:] = -inv_m[:, None] * D[np.ix_(dofs, dofs)]
+    return state_matrix_stability(A, rtol=rtol)
+
+
+def whirl_onset_scale(masses, K_fluid, D, free=None, K_extra=None, s_max=1e3, rtol=1e-6):
+    """
+    Smallest factor s on the wedge stiffness at which M q̈ + D q̇ +
+    (s K_fluid + K_extra) q = 0 loses stability.
+
+    K_fluid is proportional to the slip speed while the squeeze/whirl
+    damping is not, so s is the onset hull speed over the current one
+    (operating point held fixed). Returns inf if stable up to s_max and
+    0.0 if already unstable without wedge stiffness.
+    """
+    def unstable(scale):
+        K = scale * K_fluid if K_extra is None else scale * K_fluid + K_extra
+        return not linear_stability(masses, K, D, free=free).stable
+
+    if unstable(0.0):
+        return 0.0
+    if not unstable(s_max):
+        return np.inf
+    lo, hi = 0.0, s_max
+    while hi - lo > rtol * hi:
+        mid = 0.5 * (lo + hi)
+        if unstable(mid):
+            hi = mid
+        else:
+            lo = mid
+    return hi
+
+
 # ---------------------------
 # Example usage / test
 # ---------------------------
@@ -318,6 +846,16 @@ if __name__ == "__main__":
         print(f"Shell {i:2d}: Fx = {Fx: .3e} N, Fy = {Fy: .3e} N")
 
     # Build stiffness matrix around this configuration
-    K = build_stiffness_matrix(q0, C, MU, U_rel, L, h=1e-3)
+    K = stiffness_matrix(q0, C, MU, U_rel, L)
+    K_fd = build_stiffness_matrix(q0, C, MU, U_rel, L, h=1e-3)
+    D = damping_matrix(q0, C, MU, U_rel, L)
     print("\nStiffness matrix K shape:", K.shape)
-    # You can inspect eigenvalues, blocks, etc. as needed.
+    print(f"max |K - K_fd| / max |K| = {np.max(np.abs(K - K_fd)) / np.max(np.abs(K)):.2e}")
+    print(f"gap 0 squeeze damping (direct) = {D[0, 0]:.3e} N·s/m")
+
+    # Moving shells 1..N-2 with unit mass per metre of axial length, as an example.
+    stab = linear_stability(np.full(N_SHELLS - 2, L), K, D, free=np.arange(1, N_SHELLS - 1))
+    print(
+        f"growth rate = {stab.growth_rate:.3e} 1/s, whirl frequency = "
+        f"{stab.whirl_frequency:.3e} rad/s ({'stable' if stab.stable else 'unstable'})"
+    )
@@ -0,0 +1,133 @@
+"""
+Checkpoint and streaming trajectory files for multi_shell_time_sim.
+
+Checkpoints are single .npz archives. They are written to a temporary file
+next to the target and moved into place with os.replace, so a crash leaves
+either the previous checkpoint or the new one, never a partial file.
+
+Trajectories are plain .npy arrays of shape (rows, columns) that grow along
+axis 0. Rows are appended to the end of the file and the shape in the
+header is rewritten in place (numpy reserves room in the header for that),
+so np.load(path, mmap_mode="r") works at any time, even while a run is
+still writing.
+"""
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+from numpy.lib import format as npy_format
+
+TRAJECTORY_DTYPE = np.dtype("<f8")
+
+
+def save_checkpoint(path, **arrays):
+    """
+    Atomically write `arrays` to the .npz file `path`.
+    """
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as f:
+        np.savez(f, **arrays)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path):
+    """
+    Return the arrays of a checkpoint written by save_checkpoint as a dict.
+    """
+    with np.load(path, allow_pickle=False) as data:
+        return {name: data[name] for name in data.files}
+
+
+def trajectory_columns(n_move, first_shell=1):
+    """
+    Column names of a multi_shell_time_sim trajectory row: time followed by
+    the state vector (x/y, then vx/vy, then ω of every moving shell).
+    """
+    shells = range(first_shell, first_shell + n_move)
+    return (
+        ["t"]
+        + [f"{axis}_{s}" for s in shells for axis in ("x", "y")]
+        + [f"{axis}_{s}" for s in shells for axis in ("vx", "vy")]
+        + [f"omega_{s}" for s in shells]
+    )
+
+
+class TrajectoryWriter:
+    """
+    Appendable (rows, n_columns) float64 .npy file.
+
+    rows=None creates (or overwrites) the file; an integer reopens an
+    existing file and keeps its first `rows` rows, discarding anything
+    written after that point (e.g. after the last checkpoint). Rows are
+    buffered and written every `flush_rows` rows or on flush().
+    """
+
+    def __init__(self, path, n_columns, rows=None, flush_rows=1024, metadata=None):
+        self.path = Path(path)
+        self.n_columns = int(n_columns)
+        self.flush_rows = int(flush_rows)
+        self._pending = []
+
+        if rows is None:
+            self.rows = 0
+            with self.path.open("wb") as f:
+                self._header_size = self._write_header(f)
+            if metadata is not None:
+                with self.path.with_suffix(".json").open("w", encoding="utf-8") as f:
+                    json.dump(metadata, f, indent=2)
+            return
+
+        with self.path.open("r+b") as f:
+            version = npy_format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = npy_format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = npy_format.read_array_header_2_0(f)
+            if fortran_order or dtype != TRAJECTORY_DTYPE or len(shape) != 2 or shape[1] != self.n_columns:
+                raise ValueError(
+                    f"{self.path} holds {shape} {dtype} data; expected (rows, {self.n_columns}) float64."
+                )
+            if shape[0] < rows:
+                raise ValueError(f"{self.path} has {shape[0]} rows; the checkpoint expects {rows}.")
+            self._header_size = f.tell()
+            f.truncate(self._header_size + rows * self.n_columns * TRAJECTORY_DTYPE.itemsize)
+            self.rows = int(rows)
+            self._write_header(f)
+
+    def _write_header(self, f):
+        f.seek(0)
+        npy_format.write_array_header_1_0(
+            f, {"descr": TRAJECTORY_DTYPE.str, "fortran_order": False, "shape": (self.rows, self.n_columns)}
+        )
+        size = f.tell()
+        if getattr(self, "_header_size", size) != size:
+            raise RuntimeError(f"{self.path}: header size changed while appending.")
+        return size
+
+    def append(self, row):
+        self._pending.append(np.asarray(row, dtype=TRAJECTORY_DTYPE))
+        if len(self._pending) >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        """
+        Append the buffered rows to the file, then publish them in the header.
+        """
+        if not self._pending:
+            return
+        block = np.vstack(self._pending)
+        if block.shape[1] != self.n_columns:
+            raise ValueError(f"Trajectory rows must have {self.n_columns} columns, got {block.shape[1]}.")
+        with self.path.open("r+b") as f:
+            f.seek(0, os.SEEK_END)
+            f.write(block.tobytes())
+            f.flush()
+            self.rows += block.shape[0]
+            self._write_header(f)
+        self._pending.clear()
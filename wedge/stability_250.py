@@ -0,0 +1,212 @@
+"""
+Linear stability of the friction-buffer stack about its static offsets.
+
+Linearizes the multi_shell_time_sim equations of motion (x, y, vx, vy and
+spin ω of every moving shell) around the offsets from
+static_offset_solver.solve_static_offsets, using the analytic
+block-tridiagonal wedge stiffness and film damping from positional_250.
+The eigenvalues replace long time integrations when judging stability, and
+sweeps over damping, K_CENTER, V_HULL and shell count locate the
+boundaries where the leading whirl mode starts to grow.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+
+import numpy as np
+
+from friction_stack import FrictionBufferStack
+from positional_250 import (
+    N_SHELLS,
+    V_HULL,
+    FR_FUDGE,
+    set_radial_fudge_factor,
+    state_matrix_stability,
+)
+from static_offset_solver import solve_static_offsets
+
+C_DAMP = 3e4  # N·s/m, default of defaults/multi_shell_time_sim.yaml
+K_CENTER = 0.0  # N/m, centering spring on every moving shell
+SWEEP_PARAMS = ("damping", "k_center", "v_hull", "n_shells")
+
+
+def build_stack(n_shells=N_SHELLS, v_hull=V_HULL, hull_offset=0.0, outer_offset=0.0):
+    """
+    Uniform FrictionBufferStack of n_shells around the 250 m hull (the
+    multi_shell_time_sim mass model) and its static x offsets from
+    solve_static_offsets. The offsets do not depend on v_hull: every gap
+    force scales with the slip.
+    """
+    stack = FrictionBufferStack.build(n_shells=n_shells, v_hull=v_hull)
+    offsets = np.zeros(stack.n_shells)
+    if abs(hull_offset) > 0.0 or abs(outer_offset) > 0.0:
+        offsets = solve_static_offsets(hull_offset=hull_offset, outer_offset=outer_offset, stack=stack).offsets
+    return stack, offsets
+
+
+def state_matrix(stack, offsets=None, damping=C_DAMP, k_center=K_CENTER, film_damping=True):
+    """
+    First-order state matrix of the linearized multi-shell dynamics of a
+    FrictionBufferStack about static x offsets (default concentric).
+
+    States are grouped per moving shell as [x, y, vx, vy, ω], so the matrix
+    is block-tridiagonal with 5x5 blocks:
+
+        m a = F_fluid(q, ω) - damping v - k_center (q - q0)
+        I α = T_fluid(q, ω)
+
+    The quasi-steady terms are FrictionBufferStack.state_jacobian (analytic
+    K, spin coupling through the slip U_i = |ω_i R_i - ω_{i+1} R_{i+1}| with
+    F ∝ U, and the torque factor 1/sqrt(1 - eps^2)); the film damping D is
+    added on top. film_damping=False drops D to match the quasi-steady
+    forces integrated by multi_shell_time_sim.
+    """
+    n = stack.n_shells
+    n_move = stack.n_move
+    base = np.zeros((n, 2))
+    if offsets is not None:
+        base[:, 0] = offsets
+    state = stack.initial_state(base)
+
+    # Quasi-steady part: the time-sim Jacobian at the operating point,
+    # permuted from [positions, velocities, omegas] to [x, y, vx, vy, ω] per shell.
+    shell = np.arange(n_move)
+    order = np.empty(5 * n_move, dtype=int)
+    order[(5 * shell[:, None] + np.arange(2)).ravel()] = np.arange(2 * n_move)
+    order[(5 * shell[:, None] + 2 + np.arange(2)).ravel()] = 2 * n_move + np.arange(2 * n_move)
+    order[5 * shell + 4] = 4 * n_move + shell
+    A = stack.state_jacobian(state, base, damping)[order][:, order].toarray()
+
+    pos_idx = (5 * shell[:, None] + np.arange(2)).ravel()
+    vel_idx = pos_idx + 2
+    qd = stack.moving_dofs
+    inv_m = 1.0 / np.repeat(stack.masses, 2)
+    A[np.ix_(vel_idx, pos_idx)] -= k_center * np.diag(inv_m)
+    if film_damping:
+        D = stack.damping_matrix(base.ravel(), sparse=False)
+        A[np.ix_(vel_idx, vel_idx)] -= inv_m[:, None] * D[np.ix_(qd, qd)]
+    return A
+
+
+def analyze(n_shells=N_SHELLS, v_hull=V_HULL, damping=C_DAMP, k_center=K_CENTER,
+            hull_offset=0.0, outer_offset=0.0, film_damping=True):
+    """
+    LinearStability of one configuration.
+    """
+    stack, offsets = build_stack(n_shells, v_hull, hull_offset, outer_offset)
+    A = state_matrix(stack, offsets, damping=damping, k_center=k_center, film_damping=film_damping)
+    return state_matrix_stability(A)
+
+
+def sweep(param, values, base, tol=1e-6):
+    """
+    Evaluate `param` over `values` with the other settings from `base`.
+
+    Returns (rows, boundaries): one (value, growth_rate, whirl_frequency,
+    stable) row per value, and the parameter values where stability changes
+    between neighbours, refined by bisection (n_shells boundaries are the
+    first shell count on the other side).
+    """
+    def evaluate(value):
+        kwargs = dict(base)
+        kwargs[param] = int(round(value)) if param == "n_shells" else value
+        return analyze(**kwargs)
+
+    rows = []
+    for value in values:
+        res = evaluate(value)
+        rows.append((value, res.growth_rate, res.whirl_frequency, res.stable))
+
+    boundaries = []
+    for (lo, _, _, s_lo), (hi, _, _, s_hi) in zip(rows, rows[1:]):
+        if s_lo == s_hi:
+            continue
+        if param == "n_shells":
+            boundaries.append(hi)
+            continue
+        while abs(hi - lo) > tol * max(abs(lo), abs(hi)):
+            mid = 0.5 * (lo + hi)
+            if evaluate(mid).stable == s_lo:
+                lo = mid
+            else:
+                hi = mid
+        boundaries.append(0.5 * (lo + hi))
+    return rows, boundaries
+
+
+def _parse_values(text, param):
+    values = [float(v) for v in text.split(",") if v.strip()]
+    if not values:
+        raise ValueError("--values must list at least one number.")
+    if param == "n_shells":
+        values = [float(int(round(v))) for v in values]
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Linear stability of the friction-buffer stack about its static offsets."
+    )
+    parser.add_argument("--hull-offset", type=float, default=0.0, help="Hull x-offset (m).")
+    parser.add_argument("--outer-offset", type=float, default=0.0, help="Outer envelope x-offset (m).")
+    parser.add_argument("--damping", type=float, default=C_DAMP, help="Isotropic damper per moving shell (N·s/m).")
+    parser.add_argument("--k-center", type=float, default=K_CENTER, help="Centering spring per moving shell (N/m).")
+    parser.add_argument("--v-hull", type=float, default=V_HULL, help="Hull rim speed (m/s).")
+    parser.add_argument("--n-shells", type=int, default=N_SHELLS, help="Shells including hull and envelope.")
+    parser.add_argument("--radial-fudge", type=float, default=FR_FUDGE, help="Multiplier on Fr.")
+    parser.add_argument(
+        "--no-film-damping",
+        action="store_true",
+        help="Drop squeeze-film damping (quasi-steady forces, as in multi_shell_time_sim).",
+    )
+    parser.add_argument("--sweep", choices=SWEEP_PARAMS, help="Parameter to sweep.")
+    parser.add_argument("--values", type=str, help="Comma-separated sweep values.")
+    parser.add_argument("--modes", type=int, default=6, help="Leading eigenvalues to print.")
+    parser.add_argument("--out", type=str, default=None, help="Optional CSV of the sweep.")
+    args = parser.parse_args()
+
+    set_radial_fudge_factor(args.radial_fudge)
+    base = dict(
+        n_shells=args.n_shells,
+        v_hull=args.v_hull,
+        damping=args.damping,
+        k_center=args.k_center,
+        hull_offset=args.hull_offset,
+        outer_offset=args.outer_offset,
+        film_damping=not args.no_film_damping,
+    )
+
+    if args.sweep is None:
+        res = analyze(**base)
+        print(f"growth rate     = {res.growth_rate: .6e} 1/s")
+        print(f"whirl frequency = {res.whirl_frequency: .6e} rad/s")
+        print(f"stable          = {res.stable}")
+        print("\nLeading eigenvalues:")
+        for lam in res.eigenvalues[:args.modes]:
+            print(f"  {lam.real: .6e} {lam.imag:+.6e}j")
+        return
+
+    if not args.values:
+        parser.error("--sweep needs --values")
+    values = _parse_values(args.values, args.sweep)
+    rows, boundaries = sweep(args.sweep, values, base)
+
+    print(f"{args.sweep:>12s} | growth [1/s]  | whirl [rad/s] | stable")
+    for value, growth, whirl, stable in rows:
+        print(f"{value:12.6g} | {growth: .6e} | {whirl: .6e} | {stable}")
+    if boundaries:
+        print("\nStability boundaries: " + ", ".join(f"{args.sweep} = {b:.6g}" for b in boundaries))
+    else:
+        print("\nNo stability change within the sweep.")
+
+    if args.out:
+        with open(args.out, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow([args.sweep, "growth_rate", "whirl_frequency", "stable"])
+            writer.writerows(rows)
+        print(f"[output] saved {args.out}")
+
+
+if __name__ == "__main__":
+    main()
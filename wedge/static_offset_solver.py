@@ -11,83 +11,96 @@ from typing import Tuple
 import numpy as np
 
 from positional_250 import (
-    N_SHELLS,
     C,
     MU,
     L,
     R,
     U_rel,
-    gap_force_magnitudes,
+    gap_force_magnitudes_array,
 )
 
 
 MAX_EPS = 0.999  # avoid exactly touching c
 
 
-def _gap_force_abs(i: int, e: float) -> float:
-    if e <= 0.0:
-        return 0.0
-    Fr, _ = gap_force_magnitudes(e, C[i], MU, U_rel[i], L, R[i])
-    return abs(Fr)
+def _stack_gaps(stack) -> Tuple[np.ndarray, float, np.ndarray, float, np.ndarray]:
+    """
+    (C, MU, U_rel, L, r_inner) per gap: the positional_250 reference stack
+    when stack is None, else a friction_stack.FrictionBufferStack.
+    """
+    if stack is None:
+        return C, MU, U_rel, L, R[:-1]
+    return stack.clearances, stack.mu, stack.u_rel, stack.length, stack.radii[:-1]
+
 
+def _gap_forces_abs(e: np.ndarray, gaps) -> np.ndarray:
+    """|Fr| in every gap at offsets e (one per gap)."""
+    c, mu, u_rel, length, r_inner = gaps
+    Fr, _ = gap_force_magnitudes_array(e, c, mu, u_rel, length, r_inner)
+    return np.abs(Fr)
 
-def _invert_gap_force(i: int, target_force: float, tol: float = 1e-8) -> float:
+
+def _invert_gap_forces(target_force: float, gaps, tol: float = 1e-8) -> np.ndarray:
     """
-    Find the offset e in gap i such that |Fr(e)| = target_force.
-    Uses bisection on e ∈ [0, MAX_EPS * c_i].
+    Find the offset e in every gap such that |Fr(e)| = target_force.
+    Bisection on e ∈ [0, MAX_EPS * c_i], run for all gaps at once; a gap
+    keeps the first midpoint within tol of the target.
     """
+    c = gaps[0]
     if target_force <= 0.0:
-        return 0.0
+        return np.zeros(c.size)
 
-    c_i = C[i]
-    lo, hi = 0.0, MAX_EPS * c_i
-    f_hi = _gap_force_abs(i, hi)
-    if target_force > f_hi:
+    lo = np.zeros(c.size)
+    hi = MAX_EPS * c
+    f_hi = _gap_forces_abs(hi, gaps)
+    if np.any(target_force > f_hi):
+        i = int(np.argmax(target_force > f_hi))
         raise ValueError(
             f"Target force {target_force:.3e} exceeds max attainable "
-            f"{f_hi:.3e} in gap {i}."
+            f"{f_hi[i]:.3e} in gap {i}."
         )
 
+    e = np.empty(c.size)
+    done = np.zeros(c.size, dtype=bool)
     for _ in range(80):
         mid = 0.5 * (lo + hi)
-        f_mid = _gap_force_abs(i, mid)
-        if abs(f_mid - target_force) < tol:
-            return mid
-        if f_mid < target_force:
-            lo = mid
-        else:
-            hi = mid
-    return 0.5 * (lo + hi)
+        f_mid = _gap_forces_abs(mid, gaps)
+        hit = ~done & (np.abs(f_mid - target_force) < tol)
+        e[hit] = mid[hit]
+        done |= hit
+        if done.all():
+            return e
+        below = f_mid < target_force
+        lo = np.where(below, mid, lo)
+        hi = np.where(below, hi, mid)
+    e[~done] = 0.5 * (lo + hi)[~done]
+    return e
 
 
 def _propagate_offsets(
     hull_offset: float,
     outer_offset: float,
     target_force: float,
+    gaps,
 ) -> np.ndarray:
-    offsets = np.zeros(N_SHELLS, dtype=float)
-    offsets[0] = hull_offset
     direction = np.sign(hull_offset - outer_offset)
     if direction == 0.0:
         direction = 1.0
 
-    for i in range(N_SHELLS - 1):
-        e = _invert_gap_force(i, target_force)
-        offsets[i + 1] = offsets[i] - direction * e
-
+    e = _invert_gap_forces(target_force, gaps)
+    offsets = np.empty(e.size + 1, dtype=float)
+    offsets[0] = hull_offset
+    offsets[1:] = hull_offset - direction * np.cumsum(e)
     return offsets
 
 
-def _max_feasible_force() -> float:
-    maxima = []
-    for i in range(N_SHELLS - 1):
-        maxima.append(_gap_force_abs(i, MAX_EPS * C[i]))
-    return min(maxima)
+def _max_feasible_force(gaps) -> float:
+    return float(np.min(_gap_forces_abs(MAX_EPS * gaps[0], gaps)))
 
 
 @dataclass
 class StaticOffsetResult:
-    offsets: np.ndarray  # shape (N_SHELLS,), x offsets
+    offsets: np.ndarray  # shape (n_shells,), x offsets
     target_force: float  # magnitude of radial load per gap
     gap_forces: np.ndarray  # |Fr| per gap for the solved offsets
 
@@ -96,30 +109,36 @@ def solve_static_offsets(
     hull_offset: float,
     outer_offset: float = 0.0,
     tol: float = 1e-6,
+    stack=None,
 ) -> StaticOffsetResult:
     """
     Solve for x-offsets of all shells so that:
       * shell 0 is fixed at `hull_offset`,
       * shell N-1 is at `outer_offset`,
       * every gap has identical radial load magnitude (|Fr| = constant).
+
+    stack: a friction_stack.FrictionBufferStack; defaults to the 17-shell
+    positional_250 reference stack.
     """
+    gaps = _stack_gaps(stack)
+    n_gaps = gaps[0].size
     if abs(hull_offset - outer_offset) < tol:
-        offsets = np.full(N_SHELLS, hull_offset, dtype=float)
+        offsets = np.full(n_gaps + 1, hull_offset, dtype=float)
         return StaticOffsetResult(
             offsets=offsets,
             target_force=0.0,
-            gap_forces=np.zeros(N_SHELLS - 1, dtype=float),
+            gap_forces=np.zeros(n_gaps, dtype=float),
         )
 
     force_lo = 0.0
-    force_hi = _max_feasible_force()
-    offsets_lo = _propagate_offsets(hull_offset, outer_offset, force_lo)
+    force_hi = _max_feasible_force(gaps)
+    offsets_lo = _propagate_offsets(hull_offset, outer_offset, force_lo, gaps)
     err_lo = offsets_lo[-1] - outer_offset
     if err_lo < 0.0:
         raise RuntimeError("Lower force bound already overshoots outer offset.")
 
     # Ensure we have a high force bound that pushes beyond the target.
-    offsets_hi = _propagate_offsets(hull_offset, outer_offset, force_hi)
+    offsets_hi = _propagate_offsets(hull_offset, outer_offset, force_hi, gaps)
     err_hi = offsets_hi[-1] - outer_offset
     if err_hi > 0.0:
         raise RuntimeError(
@@ -128,7 +147,7 @@ def solve_static_offsets(
 
     for _ in range(80):
         force_mid = 0.5 * (force_lo + force_hi)
-        offsets_mid = _propagate_offsets(hull_offset, outer_offset, force_mid)
+        offsets_mid = _propagate_offsets(hull_offset, outer_offset, force_mid, gaps)
         err_mid = offsets_mid[-1] - outer_offset
         if abs(err_mid) < tol:
             offsets = offsets_mid
@@ -141,10 +160,7 @@ def solve_static_offsets(
         offsets = offsets_mid
         target_force = force_mid
 
-    gap_forces = np.zeros(N_SHELLS - 1, dtype=float)
-    for i in range(N_SHELLS - 1):
-        e = abs(offsets[i] - offsets[i + 1])
-        gap_forces[i] = _gap_force_abs(i, e)
+    gap_forces = _gap_forces_abs(np.abs(np.diff(offsets)), gaps)
 
     return StaticOffsetResult(offsets=offsets, target_force=target_force, gap_forces=gap_forces)
 
@@ -63,6 +63,25 @@ def steady_state_omegas(radii, clearances, mu, length, omega_inner, omega_outer,
     return omegas
 
 
+def series_steady_omegas(coeffs, omega_inner, omega_outer):
+    """
+    Direct O(N) solution of the balance solved by steady_state_omegas.
+
+    The gaps act as rotational dampers in series, so each gap carries the
+    same torque τ = (ω_inner - ω_outer) / Σ 1/coeff_i and ω drops by
+    τ / coeff_i across gap i. Returns ω_i for every shell, length len(coeffs) + 1.
+    """
+    inv = 1.0 / np.asarray(coeffs, dtype=float)
+    if inv.size < 1 or np.any(inv <= 0.0):
+        raise ValueError("Expected at least one positive torque coefficient.")
+    tau = (omega_inner - omega_outer) / inv.sum()
+    omegas = np.empty(inv.size + 1)
+    omegas[0] = omega_inner
+    omegas[1:] = omega_inner - tau * np.cumsum(inv)
+    omegas[-1] = omega_outer
+    return omegas
+
+
 def torque_factor_from_offset(eccentricity, clearance):
     """
     Returns the multiplicative factor 1/sqrt(1 - eps^2) from lit/torque.md.
@@ -87,6 +106,17 @@ def signed_torque_on_inner(omega_inner, omega_outer, coeff, eccentricity, cleara
     return -coeff * delta * factor
 
 
+def signed_torques_on_inner(omega_inner, omega_outer, coeffs, eccentricities, clearances):
+    """
+    Array version of signed_torque_on_inner over all gaps at once.
+    """
+    eps = np.asarray(eccentricities, dtype=float) / clearances
+    if np.any(eps >= 1.0):
+        raise ValueError("Eccentricity exceeds clearance in torque computation.")
+    factor = 1.0 / np.sqrt(1.0 - eps * eps)
+    return -coeffs * (omega_inner - omega_outer) * factor
+
+
 if __name__ == "__main__":
     import sys
 